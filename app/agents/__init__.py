@@ -7,6 +7,7 @@ from .analyzer import (
     performance_review,
     style_review,
     logic_review,
+    run_all_reviews,
     SecurityAnalyzer,
     PerformanceAnalyzer,
     StyleAnalyzer,
@@ -22,6 +23,7 @@ __all__ = [
     "performance_review", 
     "style_review",
     "logic_review",
+    "run_all_reviews",
     "SecurityAnalyzer",
     "PerformanceAnalyzer",
     "StyleAnalyzer", 
@@ -1,42 +1,205 @@
 import os
 import re
-import ast
-from typing import Dict, List, Optional, Set
+import json
+import asyncio
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Optional, Union
 from abc import ABC, abstractmethod
-from dotenv import load_dotenv
+import httpx
 from groq import AsyncGroq
 from app.utils.logging import logger
+from app.utils.llm_cache import llm_cache
+
+# Cap on concurrent LLM requests per review stage (Groq rate limits)
+MAX_CONCURRENT_ANALYSES = 8
+
+# Connection pool shared by all analyzers; sized for 4 stages x MAX_CONCURRENT_ANALYSES
+GROQ_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+GROQ_TIMEOUT = 60.0
+
+# Batching: several files of the same language share one LLM request
+BATCH_TOKEN_BUDGET = 6000  # Estimated input tokens per request (~4 chars/token)
+MAX_FILES_PER_BATCH = 5
+
+# Response budget: a single file gets MAX_OUTPUT_TOKENS_SINGLE, a batch gets
+# OUTPUT_TOKENS_PER_FILE per file so one truncated JSON reply can't drop every file
+MAX_OUTPUT_TOKENS_SINGLE = 3072
+OUTPUT_TOKENS_PER_FILE = 1536
+MAX_OUTPUT_TOKENS = 8192
+
+BATCH_ANALYSIS_FOCUS = "ANALYZING MULTIPLE FILES (each file states whether changes or the entire file are shown)"
+
+BATCH_OUTPUT_INSTRUCTIONS = """
+
+The code to review contains multiple files, each wrapped in
+'=== BEGIN FILE n: <filename> (<language>) ===' and '=== END FILE n ===' markers.
+Instead of a single "issues" list, respond with a JSON object of the form
+{"files": [{"file": <n>, "issues": [<issue objects as described above>]}]}
+Skip files that have no issues."""
+
+# Language-agnostic dependency patterns
+DEPENDENCY_PATTERNS = {
+    'python': [r'^\s*(import|from)\s+(\w+)', r'^\s*from\s+(\w+)'],
+    'javascript': [r'^\s*(import|require)\s*.*[\'"`](\w+)[\'"`]', r'^\s*const\s+\w+\s*=\s*require\([\'"`](\w+)[\'"`]\)'],
+    'typescript': [r'^\s*import\s+.*from\s+[\'"`](\w+)[\'"`]', r'^\s*import\s+[\'"`](\w+)[\'"`]'],
+    'java': [r'^\s*import\s+([\w.]+)', r'^\s*package\s+([\w.]+)'],
+    'go': [r'^\s*import\s+["`]([^"`]+)["`]', r'^\s*import\s+(\w+)'],
+    'rust': [r'^\s*use\s+([\w:]+)', r'^\s*extern\s+crate\s+(\w+)'],
+    'cpp': [r'^\s*#include\s*[<"]([^>"]+)[>"]'],
+    'c': [r'^\s*#include\s*[<"]([^>"]+)[>"]']
+}
+
+# Language mappings - more comprehensive
+LANGUAGE_FAMILIES = {
+    'c-like': ['c', 'cpp', 'csharp', 'java', 'javascript', 'typescript', 'go', 'rust', 'kotlin', 'scala', 'swift'],
+    'python-like': ['python'],
+    'web': ['html', 'css', 'scss', 'javascript', 'typescript', 'react', 'react-typescript'],
+    'functional': ['scala', 'kotlin', 'swift'],
+    'systems': ['c', 'cpp', 'rust', 'go'],
+    'jvm': ['java', 'kotlin', 'scala'],
+    'scripting': ['python', 'ruby', 'php', 'bash'],
+    'compiled': ['c', 'cpp', 'rust', 'go', 'java', 'csharp', 'swift', 'kotlin', 'scala']
+}
+
+# Inverted once at import: language -> families in declaration order
+_LANG_TO_FAMILY: Dict[str, List[str]] = {}
+for _family, _languages in LANGUAGE_FAMILIES.items():
+    for _language in _languages:
+        _LANG_TO_FAMILY.setdefault(_language, []).append(_family)
+
+LANGUAGE_CONTEXTS = {
+    'security': {
+        'c-like': "Focus on: buffer overflows, null pointer dereferences, memory leaks, unsafe casts, unvalidated input",
+        'python-like': "Focus on: SQL injection, pickle/eval usage, subprocess calls, file path traversal, input validation",
+        'web': "Focus on: XSS vulnerabilities, CSRF, unsafe DOM manipulation, eval() usage, input sanitization",
+        'jvm': "Focus on: deserialization attacks, SQL injection, XML external entities, reflection usage",
+        'systems': "Focus on: memory safety, buffer overflows, integer overflows, race conditions, unsafe operations",
+        'scripting': "Focus on: command injection, file inclusion, eval usage, input validation, privilege escalation"
+    },
+    'performance': {
+        'c-like': "Focus on: algorithm complexity, memory allocation patterns, loop optimization, cache efficiency",
+        'python-like': "Focus on: list comprehensions vs loops, generator usage, numpy vectorization, database query patterns",
+        'web': "Focus on: DOM manipulation efficiency, event handling, bundle size, lazy loading, memory leaks",
+        'jvm': "Focus on: garbage collection impact, collection sizing, stream API usage, reflection overhead",
+        'systems': "Focus on: memory allocation, cache locality, SIMD usage, lock contention",
+        'functional': "Focus on: tail recursion, immutable data structures, lazy evaluation, collection operations"
+    },
+    'style': {
+        'c-like': "Check: consistent naming (camelCase/snake_case), proper indentation, clear function signatures, code organization",
+        'python-like': "Follow PEP 8: snake_case naming, proper imports, docstrings, type hints, line length (88-100 chars)",
+        'web': "Follow JS standards: camelCase naming, const/let usage, arrow functions, JSDoc comments, ES6+ features",
+        'jvm': "Follow conventions: PascalCase classes, camelCase methods, proper JavaDoc, exception handling"
+    },
+    'logic': {
+        'c-like': "Check: null pointer checks, array bounds, memory management, type safety, edge cases",
+        'python-like': "Check: None checks, exception handling, iterator exhaustion, async/await usage, edge cases",
+        'web': "Check: undefined/null checks, async promise handling, type coercion, event cleanup, edge cases",
+        'systems': "Check: memory safety, concurrent access, resource cleanup, error propagation"
+    }
+}
+
+# Severity keywords in priority order (first matching severity wins)
+SEVERITY_INDICATORS = {
+    "critical": ["critical", "severe", "dangerous", "fatal", "security", "vulnerability"],
+    "high": ["high", "important", "significant", "major", "error"],
+    "medium": ["medium", "moderate", "warning", "issue"],
+    "low": ["low", "minor", "style", "formatting", "cosmetic"]
+}
+
+# Precompiled regexes used on the per-file / per-response hot paths
+_RE_DEP_PATTERNS = {
+    language: [re.compile(p) for p in patterns]
+    for language, patterns in DEPENDENCY_PATTERNS.items()
+}
+_RE_WS = re.compile(r'\s+')
+_RE_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z_0-9]*')
+_RE_SECTION_SPLIT = re.compile(r'---+|\n\n\n+')
+_RE_LINE_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (r'line\s*(\d+)', r'@\s*(\d+)', r':\s*(\d+)', r'#\s*(\d+)')
+]
+_RE_PATCH_LINE = re.compile(r'(?m)^(?:(?P<add>\+(?!\+\+).*)|(?P<rem>-(?!--).*)|(?P<ctx> .*))$')
+# Section keywords that introduce the issue description vs. the suggested fix
+_ISSUE_KEYS = frozenset({'ISSUE', 'BUG', 'PERF_ISSUE', 'STYLE_ISSUE', 'SECURITY', 'PROBLEM', 'VULNERABILITY', 'WARNING'})
+_FIX_KEYS = frozenset({'FIX', 'SUGGESTION', 'OPTIMIZATION', 'RECOMMENDATION', 'SOLUTION', 'IMPROVE'})
+_ISSUE_KEYS_ALT = '|'.join(sorted(_ISSUE_KEYS))
+_FIX_KEYS_ALT = '|'.join(sorted(_FIX_KEYS))
+_RE_SECTION_KEYWORD = re.compile(
+    rf'^[ \t*_#>-]*(?P<line>(?P<keyword>{_ISSUE_KEYS_ALT}|{_FIX_KEYS_ALT}|IMPACT)\b[ \t*_]*:.*)$',
+    re.IGNORECASE | re.MULTILINE
+)
+_RE_ISSUE_PREFIX = re.compile(rf'^[\s*_]*(?:{_ISSUE_KEYS_ALT})[\s*_]*:[\s*_]*', re.IGNORECASE)
+_RE_FIX_PREFIX = re.compile(rf'^[\s*_]*(?:{_FIX_KEYS_ALT})[\s*_]*:[\s*_]*', re.IGNORECASE)
+_RE_IMPACT_PREFIX = re.compile(r'^[\s*_]*IMPACT[\s*_]*:[\s*_]*', re.IGNORECASE)
+_RE_SEVERITY = re.compile('|'.join(
+    f"(?P<{severity}>{'|'.join(indicators)})" for severity, indicators in SEVERITY_INDICATORS.items()
+))
+_RE_FILE_HEADER = re.compile(r'^\s*FILE\s+(\d+)\s*:', re.IGNORECASE | re.MULTILINE)
+
+@lru_cache(maxsize=256)
+def _language_context(analysis_type: str, language: str) -> str:
+    """Resolve language-specific guidance; pure in its arguments, so memoized."""
+    contexts = LANGUAGE_CONTEXTS.get(analysis_type, {})
+    
+    # Use the first family of this language that has guidance for the analysis type
+    for family in _LANG_TO_FAMILY.get(language, ()):
+        context = contexts.get(family)
+        if context:
+            return context
+    
+    return f"Analyze this {language} code for {analysis_type} issues using best practices."
+
+
+def _format_categories(categories: List[str]) -> str:
+    """Render analysis categories as the numbered list used in prompts."""
+    return "\n".join(f"{i+1}. {cat}" for i, cat in enumerate(categories))
+
+
+_groq_client: Optional[AsyncGroq] = None
+_groq_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_groq_client() -> AsyncGroq:
+    """Return the AsyncGroq client shared by all analyzers on the running event loop.
+    
+    httpx connection pools are bound to the loop they were created on, so a new
+    client is created if the running loop changed.
+    """
+    global _groq_client, _groq_client_loop
+    loop = asyncio.get_running_loop()
+    if _groq_client is None or _groq_client_loop is not loop:
+        _groq_client = AsyncGroq(
+            api_key=os.getenv('GROQ_API_KEY'),
+            http_client=httpx.AsyncClient(limits=GROQ_HTTP_LIMITS, timeout=GROQ_TIMEOUT)
+        )
+        _groq_client_loop = loop
+    return _groq_client
 
-# Load environment variables
-load_dotenv()
 
 class BaseAnalyzer(ABC):
     """Enhanced base class for all code analyzers."""
     
+    # Comprehensive language support
+    SUPPORTED_LANGUAGES = frozenset({
+        'python', 'javascript', 'typescript', 'java', 'go', 'rust', 'cpp', 'c', 
+        'csharp', 'php', 'ruby', 'swift', 'kotlin', 'scala', 'sql', 'bash',
+        'react', 'react-typescript'
+    })
+    
+    # Non-code files are skipped
+    SKIP_LANGUAGES = frozenset({"text", "markdown", "json", "yaml", "xml"})
+    # Tuple so str.endswith can check every suffix in one call
+    SKIP_EXTENSIONS = (".md", ".txt", ".json", ".yaml", ".yml", ".xml", ".lock", ".gitignore")
+    
+    # Prompt scaffolding is constant per analyzer, so subclasses format it once
+    CATEGORIES_TEXT: str = ""
+    OUTPUT_FORMAT: str = ""
+    
     def __init__(self):
-        groq_api_key = os.getenv('GROQ_API_KEY')
-        self.client = AsyncGroq(api_key=groq_api_key)
         # Use the most capable model available
         self.model = "llama-3.3-70b-versatile" 
-        
-        # Language mappings - more comprehensive
-        self.language_families = {
-            'c-like': ['c', 'cpp', 'csharp', 'java', 'javascript', 'typescript', 'go', 'rust', 'kotlin', 'scala', 'swift'],
-            'python-like': ['python'],
-            'web': ['html', 'css', 'scss', 'javascript', 'typescript', 'react', 'react-typescript'],
-            'functional': ['scala', 'kotlin', 'swift'],
-            'systems': ['c', 'cpp', 'rust', 'go'],
-            'jvm': ['java', 'kotlin', 'scala'],
-            'scripting': ['python', 'ruby', 'php', 'bash'],
-            'compiled': ['c', 'cpp', 'rust', 'go', 'java', 'csharp', 'swift', 'kotlin', 'scala']
-        }
-        
-        # Comprehensive language support
-        self.supported_languages = {
-            'python', 'javascript', 'typescript', 'java', 'go', 'rust', 'cpp', 'c', 
-            'csharp', 'php', 'ruby', 'swift', 'kotlin', 'scala', 'sql', 'bash',
-            'react', 'react-typescript'
-        }
     
     def should_analyze_file(self, file_data: Dict) -> bool:
         """Determine if file should be analyzed based on language and content."""
@@ -44,13 +207,15 @@ class BaseAnalyzer(ABC):
         filename = file_data.get("filename", "")
         
         # Skip non-code files
-        skip_languages = {"text", "markdown", "json", "yaml", "xml"}
-        if language in skip_languages:
+        if language in self.SKIP_LANGUAGES:
             return False
             
         # Skip certain file types
-        skip_extensions = {".md", ".txt", ".json", ".yaml", ".yml", ".xml", ".lock", ".gitignore"}
-        if any(filename.lower().endswith(ext) for ext in skip_extensions):
+        if filename.lower().endswith(self.SKIP_EXTENSIONS):
+            return False
+        
+        # Skip files the fetcher dropped both content and patch for (vendored/binary)
+        if file_data.get("truncated") and not file_data.get("patch"):
             return False
             
         return True
@@ -63,14 +228,12 @@ class BaseAnalyzer(ABC):
         added_lines = []
         removed_lines = []
         context_lines = []
+        buckets = {"add": added_lines, "rem": removed_lines, "ctx": context_lines}
         
-        for line in patch.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
-                added_lines.append(line[1:].strip())
-            elif line.startswith('-') and not line.startswith('---'):
-                removed_lines.append(line[1:].strip())
-            elif line.startswith(' '):
-                context_lines.append(line[1:].strip())
+        # Classify every patch line in a single regex pass
+        for match in _RE_PATCH_LINE.finditer(patch):
+            kind = match.lastgroup
+            buckets[kind].append(match.group(kind)[1:].strip())
         
         return {
             "added": added_lines,
@@ -83,19 +246,7 @@ class BaseAnalyzer(ABC):
         issues = []
         removed_lines = changes.get("removed", [])
         
-        # Language-agnostic dependency patterns
-        dependency_patterns = {
-            'python': [r'^\s*(import|from)\s+(\w+)', r'^\s*from\s+(\w+)'],
-            'javascript': [r'^\s*(import|require)\s*.*[\'"`](\w+)[\'"`]', r'^\s*const\s+\w+\s*=\s*require\([\'"`](\w+)[\'"`]\)'],
-            'typescript': [r'^\s*import\s+.*from\s+[\'"`](\w+)[\'"`]', r'^\s*import\s+[\'"`](\w+)[\'"`]'],
-            'java': [r'^\s*import\s+([\w.]+)', r'^\s*package\s+([\w.]+)'],
-            'go': [r'^\s*import\s+["`]([^"`]+)["`]', r'^\s*import\s+(\w+)'],
-            'rust': [r'^\s*use\s+([\w:]+)', r'^\s*extern\s+crate\s+(\w+)'],
-            'cpp': [r'^\s*#include\s*[<"]([^>"]+)[>"]'],
-            'c': [r'^\s*#include\s*[<"]([^>"]+)[>"]']
-        }
-        
-        patterns = dependency_patterns.get(language, [])
+        patterns = _RE_DEP_PATTERNS.get(language, [])
         if not patterns:
             return issues
         
@@ -103,7 +254,7 @@ class BaseAnalyzer(ABC):
         removed_deps = set()
         for line in removed_lines:
             for pattern in patterns:
-                matches = re.findall(pattern, line.strip())
+                matches = pattern.findall(line.strip())
                 for match in matches:
                     if isinstance(match, tuple):
                         removed_deps.add(match[1] if len(match) > 1 else match[0])
@@ -112,9 +263,14 @@ class BaseAnalyzer(ABC):
         
         # Check if removed dependencies are still referenced in the file
         if removed_deps and content:
+            # Tokenize the file once; identifier deps are then matched as whole words
+            content_identifiers = set(_RE_IDENTIFIER.findall(content))
             for dep in removed_deps:
-                # Simple string search - could be refined per language
-                if dep in content and len(dep) > 2:  # Avoid false positives on short names
+                if len(dep) <= 2:  # Avoid false positives on short names
+                    continue
+                # Dotted/path deps (java.util.List, stdio.h) are not single identifiers
+                referenced = dep in content_identifiers if dep.isidentifier() else dep in content
+                if referenced:
                     issues.append({
                         "type": self.get_analysis_type(),
                         "filename": "",
@@ -133,116 +289,69 @@ class BaseAnalyzer(ABC):
         issues = []
         added_lines = changes.get("added", [])
         
-        # Remove empty lines and normalize whitespace
-        normalized_lines = []
-        for line in added_lines:
-            cleaned = re.sub(r'\s+', ' ', line.strip())
-            if cleaned and not cleaned.startswith('#'):  # Skip comments
-                normalized_lines.append(cleaned)
-        
-        # Check for exact duplicates
-        seen_lines = {}
-        for i, line in enumerate(normalized_lines):
-            if line in seen_lines:
+        if len(added_lines) < 2:
+            return issues
+        
+        # Normalize whitespace and count in one pass, skipping empty lines and comments
+        line_counts = Counter(
+            cleaned for cleaned in (_RE_WS.sub(' ', line.strip()) for line in added_lines)
+            if cleaned and not cleaned.startswith('#')
+        )
+        
+        # Report each duplicated line once
+        for line, count in line_counts.items():
+            if count > 1:
                 issues.append({
                     "type": self.get_analysis_type(),
                     "filename": "",
                     "line": None,
                     "severity": "medium",
-                    "description": f"Duplicate code detected: '{line[:50]}...'",
+                    "description": f"Duplicate code detected ({count} occurrences): '{line[:50]}...'",
                     "suggestion": "Remove duplicate code or extract to a function",
                     "impact": "Code duplication makes maintenance harder",
                     "category": "duplication"
                 })
-            else:
-                seen_lines[line] = i
         
         return issues
     
     def get_language_context(self, language: str) -> str:
         """Get language-specific context for analysis."""
-        contexts = {
-            'security': {
-                'c-like': "Focus on: buffer overflows, null pointer dereferences, memory leaks, unsafe casts, unvalidated input",
-                'python-like': "Focus on: SQL injection, pickle/eval usage, subprocess calls, file path traversal, input validation",
-                'web': "Focus on: XSS vulnerabilities, CSRF, unsafe DOM manipulation, eval() usage, input sanitization",
-                'jvm': "Focus on: deserialization attacks, SQL injection, XML external entities, reflection usage",
-                'systems': "Focus on: memory safety, buffer overflows, integer overflows, race conditions, unsafe operations",
-                'scripting': "Focus on: command injection, file inclusion, eval usage, input validation, privilege escalation"
-            },
-            'performance': {
-                'c-like': "Focus on: algorithm complexity, memory allocation patterns, loop optimization, cache efficiency",
-                'python-like': "Focus on: list comprehensions vs loops, generator usage, numpy vectorization, database query patterns",
-                'web': "Focus on: DOM manipulation efficiency, event handling, bundle size, lazy loading, memory leaks",
-                'jvm': "Focus on: garbage collection impact, collection sizing, stream API usage, reflection overhead",
-                'systems': "Focus on: memory allocation, cache locality, SIMD usage, lock contention",
-                'functional': "Focus on: tail recursion, immutable data structures, lazy evaluation, collection operations"
-            },
-            'style': {
-                'c-like': "Check: consistent naming (camelCase/snake_case), proper indentation, clear function signatures, code organization",
-                'python-like': "Follow PEP 8: snake_case naming, proper imports, docstrings, type hints, line length (88-100 chars)",
-                'web': "Follow JS standards: camelCase naming, const/let usage, arrow functions, JSDoc comments, ES6+ features",
-                'jvm': "Follow conventions: PascalCase classes, camelCase methods, proper JavaDoc, exception handling"
-            },
-            'logic': {
-                'c-like': "Check: null pointer checks, array bounds, memory management, type safety, edge cases",
-                'python-like': "Check: None checks, exception handling, iterator exhaustion, async/await usage, edge cases",
-                'web': "Check: undefined/null checks, async promise handling, type coercion, event cleanup, edge cases",
-                'systems': "Check: memory safety, concurrent access, resource cleanup, error propagation"
-            }
-        }
-        
-        analysis_type = self.get_analysis_type()
-        
-        # Find which family this language belongs to
-        for family, languages in self.language_families.items():
-            if language in languages:
-                return contexts.get(analysis_type, {}).get(family, "")
-        
-        return f"Analyze this {language} code for {analysis_type} issues using best practices."
+        return _language_context(self.get_analysis_type(), language)
     
     @abstractmethod
     def get_analysis_type(self) -> str:
         """Return the type of analysis (security, performance, style, logic)."""
         pass
     
-    @abstractmethod
-    def get_analysis_categories(self) -> List[str]:
-        """Return specific categories to analyze."""
-        pass
+    def get_analysis_categories_text(self) -> str:
+        """Return the numbered categories to analyze, formatted for the prompt."""
+        return self.CATEGORIES_TEXT
     
-    @abstractmethod
     def get_output_format(self) -> str:
         """Return expected output format for the LLM."""
-        pass
+        return self.OUTPUT_FORMAT
     
-    async def analyze(self, file_data: Dict) -> List[Dict]:
-        """Enhanced analyze method focusing on actual changes."""
-        try:
-            if not self.should_analyze_file(file_data):
-                return []
-                
-            filename = file_data["filename"]
-            content = file_data.get("content", "")
-            patch = file_data.get("patch", "")
-            language = file_data.get("language", "text")
-            
-            issues = []
-            
-            # Extract changes from patch
-            changes = self.extract_changes_from_patch(patch)
+    def _prepare_file(self, file_data: Dict) -> Optional[Dict]:
+        """Extract the code to send to the LLM and run static checks for a file."""
+        filename = file_data["filename"]
+        content = file_data.get("content", "")
+        patch = file_data.get("patch", "")
+        language = file_data.get("language", "text")
+        
+        # Extract changes from patch
+        changes = self.extract_changes_from_patch(patch)
+        
+        # If no patch but has content, analyze the content (new file)
+        if not patch and content:
+            code_to_analyze = content
+            analysis_focus = "ANALYZING ENTIRE FILE (new file)"
+        elif patch:
+            # Focus on changes
+            added_lines = '\n'.join(changes["added"])
+            removed_lines = '\n'.join(changes["removed"])
+            context_lines = '\n'.join(changes["context"][:5])  # Limited context
             
-            # If no patch but has content, analyze the content (new file)
-            if not patch and content:
-                code_to_analyze = content
-                analysis_focus = "ANALYZING ENTIRE FILE (new file)"
-            elif patch:
-                # Focus on changes
-                added_lines = '\n'.join(changes["added"])
-                removed_lines = '\n'.join(changes["removed"])
-                context_lines = '\n'.join(changes["context"][:5])  # Limited context
-                
-                code_to_analyze = f"""ADDED LINES:
+            code_to_analyze = f"""ADDED LINES:
 {added_lines}
 
 REMOVED LINES:
@@ -250,34 +359,124 @@ REMOVED LINES:
 
 SURROUNDING CONTEXT:
 {context_lines}"""
-                analysis_focus = "ANALYZING CHANGES (focus on added/removed lines)"
-            else:
+            analysis_focus = "ANALYZING CHANGES (focus on added/removed lines)"
+        else:
+            return None
+        
+        # Add language-agnostic static analysis
+        static_issues = self.analyze_removed_dependencies(content, changes, language)
+        
+        # Add duplication detection for all languages
+        static_issues.extend(self.detect_code_duplication(changes))
+        
+        return {
+            "filename": filename,
+            "language": language,
+            "code_to_analyze": code_to_analyze,
+            "analysis_focus": analysis_focus,
+            "static_issues": static_issues
+        }
+    
+    @property
+    def client(self) -> AsyncGroq:
+        return get_groq_client()
+    
+    def _completion_params(self, system_prompt: str, user_content: str,
+                           max_tokens: int = MAX_OUTPUT_TOKENS_SINGLE) -> Dict:
+        """Common chat completion parameters for an analysis request."""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            "temperature": 0.1,
+            "max_tokens": max_tokens,
+        }
+    
+    async def _complete(self, system_prompt: str, user_content: str,
+                        max_tokens: int = MAX_OUTPUT_TOKENS_SINGLE) -> str:
+        """Send a chat completion request, reusing cached responses for identical input."""
+        cache_key = llm_cache.make_key(self.model, system_prompt, user_content, max_tokens)
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("LLM cache hit", analysis_type=self.get_analysis_type())
+            return cached
+        
+        analysis_text, finish_reason = await self._stream_completion(system_prompt, user_content, max_tokens)
+        # Truncated or malformed replies are returned once but never pinned in the cache
+        if finish_reason == "stop" and _load_json_object(analysis_text) is not None:
+            await llm_cache.set(cache_key, analysis_text)
+        
+        return analysis_text
+    
+    async def _stream_completion(self, system_prompt: str, user_content: str, max_tokens: int) -> tuple:
+        """Stream a completion, returning (text, finish reason).
+        
+        The stream is closed as soon as the top-level JSON object is complete, so
+        trailing padding is never waited on, or once max_tokens streamed deltas
+        (about one token each) have arrived, which is reported as "length".
+        """
+        parts = []
+        finish_reason = None
+        scanner = _JsonObjectScanner()
+        
+        stream = await self.client.chat.completions.create(
+            **self._completion_params(system_prompt, user_content, max_tokens),
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+        async with stream:
+            deltas = 0
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                content = choice.delta.content
+                if content:
+                    parts.append(content)
+                    deltas += 1
+                    if scanner.feed(content):
+                        finish_reason = "stop"
+                        break
+                    if deltas >= max_tokens:
+                        finish_reason = "length"
+                        logger.warning("LLM response reached its token budget",
+                                       analysis_type=self.get_analysis_type(), max_tokens=max_tokens)
+                        break
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        
+        return "".join(parts), finish_reason
+    
+    def _build_messages(self, prepared: Dict) -> tuple:
+        """Build the (system prompt, user content) pair for a single prepared file."""
+        language = prepared["language"]
+        
+        # LLM-based analysis with enhanced prompt
+        prompt = self._build_enhanced_prompt(language, prepared["analysis_focus"])
+        user_content = f"File: {prepared['filename']}\nLanguage: {language}\n\n{prepared['code_to_analyze']}"
+        
+        return prompt, user_content
+    
+    async def _analyze_prepared(self, prepared: Dict) -> List[Dict]:
+        """Run LLM analysis for a single prepared file."""
+        analysis_text = await self._complete(*self._build_messages(prepared))
+        return self._parse_issues(analysis_text, prepared["filename"])
+    
+    async def analyze(self, file_data: Dict) -> List[Dict]:
+        """Enhanced analyze method focusing on actual changes."""
+        filename = file_data.get("filename", "")
+        try:
+            if not self.should_analyze_file(file_data):
                 return []
             
-            # Add language-agnostic static analysis
-            static_issues = self.analyze_removed_dependencies(content, changes, language)
-            issues.extend(static_issues)
-            
-            # Add duplication detection for all languages
-            duplication_issues = self.detect_code_duplication(changes)
-            issues.extend(duplication_issues)
-            
-            # LLM-based analysis with enhanced prompt
-            prompt = self._build_enhanced_prompt(language, analysis_focus)
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"File: {filename}\nLanguage: {language}\n\n{code_to_analyze}"}
-                ],
-                temperature=0.1,
-                max_tokens=3072,  # Increased for more detailed analysis
-            )
+            prepared = self._prepare_file(file_data)
+            if not prepared:
+                return []
             
-            analysis_text = response.choices[0].message.content
-            llm_issues = self._parse_issues(analysis_text, filename)
-            issues.extend(llm_issues)
+            issues = prepared["static_issues"]
+            issues.extend(await self._analyze_prepared(prepared))
             
             return issues
             
@@ -285,15 +484,107 @@ SURROUNDING CONTEXT:
             logger.error(f"{self.get_analysis_type()} analysis failed", filename=filename, error=str(e))
             return []
     
+    async def analyze_batch(self, files: List[Dict]) -> Dict[str, List[Dict]]:
+        """Analyze several files with a single LLM request.
+        
+        Files are expected to share a language, since the system prompt carries
+        language-specific guidance. Returns issues keyed by filename.
+        """
+        results = {}
+        prepared_files = []
+        
+        try:
+            for file_data in files:
+                if not self.should_analyze_file(file_data):
+                    continue
+                prepared = self._prepare_file(file_data)
+                if prepared:
+                    prepared_files.append(prepared)
+                    results[prepared["filename"]] = prepared["static_issues"]
+            
+            if not prepared_files:
+                return results
+            
+            if len(prepared_files) == 1:
+                prepared = prepared_files[0]
+                results[prepared["filename"]].extend(await self._analyze_prepared(prepared))
+                return results
+            
+            language = prepared_files[0]["language"]
+            prompt = self._build_enhanced_prompt(language, BATCH_ANALYSIS_FOCUS) + BATCH_OUTPUT_INSTRUCTIONS
+            
+            sections = []
+            for index, prepared in enumerate(prepared_files, 1):
+                sections.append(
+                    f"=== BEGIN FILE {index}: {prepared['filename']} ({prepared['language']}) ===\n"
+                    f"{prepared['analysis_focus']}\n\n"
+                    f"{prepared['code_to_analyze']}\n"
+                    f"=== END FILE {index} ==="
+                )
+            
+            max_tokens = min(OUTPUT_TOKENS_PER_FILE * len(prepared_files), MAX_OUTPUT_TOKENS)
+            analysis_text = await self._complete(prompt, "\n\n".join(sections), max_tokens)
+            
+            blocks = self._split_batch_response(analysis_text)
+            if blocks is None:
+                # Issues came back without file attribution; review each file on its own
+                logger.warning(f"{self.get_analysis_type()} batch reply had no per-file results, retrying files individually",
+                              filenames=[p["filename"] for p in prepared_files])
+                for prepared in prepared_files:
+                    results[prepared["filename"]].extend(await self._analyze_prepared(prepared))
+                return results
+            
+            for index, block in blocks:
+                if 1 <= index <= len(prepared_files):
+                    filename = prepared_files[index - 1]["filename"]
+                    results[filename].extend(self._parse_issues(block, filename))
+            
+        except Exception as e:
+            logger.error(f"{self.get_analysis_type()} batch analysis failed",
+                        filenames=[p["filename"] for p in prepared_files], error=str(e))
+        
+        return results
+    
+    def _split_batch_response(self, analysis_text: str) -> Optional[List[tuple]]:
+        """Split a batched LLM response into (file index, issues payload) blocks.
+        
+        Returns None for a JSON reply that lists issues without a "files" key,
+        since those issues cannot be attributed to a file.
+        """
+        data = _load_json_object(analysis_text)
+        if data is not None:
+            if "files" not in data and data.get("issues"):
+                return None
+            blocks = []
+            for entry in data.get("files") or []:
+                if not isinstance(entry, dict):
+                    continue
+                try:
+                    index = int(entry.get("file"))
+                except (TypeError, ValueError):
+                    continue
+                blocks.append((index, {"issues": entry.get("issues") or []}))
+            return blocks
+        
+        # Fall back to 'FILE n:' headers in free-form text
+        headers = list(_RE_FILE_HEADER.finditer(analysis_text))
+        
+        blocks = []
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(analysis_text)
+            blocks.append((int(header.group(1)), analysis_text[header.end():end]))
+        
+        return blocks
+    
+    # Analyzers are module-level singletons, so caching on self stays bounded
+    @lru_cache(maxsize=64)
     def _build_enhanced_prompt(self, language: str, analysis_focus: str) -> str:
         """Build enhanced analysis prompt focusing on changes."""
         analysis_type = self.get_analysis_type()
-        categories = self.get_analysis_categories()
+        categories_text = self.get_analysis_categories_text()
         output_format = self.get_output_format()
         language_context = self.get_language_context(language)
         
-        categories_text = "\n".join([f"{i+1}. {cat}" for i, cat in enumerate(categories)])
-        
         prompt = f"""You are a senior {analysis_type} engineer reviewing code changes for a Pull Request.
 
 {analysis_focus}
@@ -328,16 +619,58 @@ IMPORTANT:
         
         return prompt
     
-    def _parse_issues(self, analysis_text: str, filename: str) -> List[Dict]:
-        """Enhanced parsing with better error handling."""
+    def _parse_issues(self, analysis: Union[str, Dict], filename: str) -> List[Dict]:
+        """Parse LLM output (JSON object or legacy free-form text) into issues."""
+        data = analysis if isinstance(analysis, dict) else _load_json_object(analysis)
+        if data is not None:
+            return self._issues_from_json(data.get("issues") or [], filename)
+        
+        return self._parse_text_issues(analysis, filename)
+    
+    def _issues_from_json(self, items: List, filename: str) -> List[Dict]:
+        """Normalize issues decoded from a JSON response."""
         issues = []
+        analysis_type = self.get_analysis_type()
         
-        try:
-            # Split by multiple possible delimiters
-            sections = re.split(r'---+|\n\n\n+', analysis_text)
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            
+            description = str(item.get("description") or "").strip()
+            if not description:
+                continue
             
-            for section in sections:
-                issue_data = self._extract_issue_from_section(section.strip(), filename)
+            # Canonicalize once at ingest; downstream code indexes by severity directly
+            severity = str(item.get("severity") or "medium").strip().lower()
+            if severity not in SEVERITY_INDICATORS:
+                severity = "medium"
+            
+            try:
+                line_number = int(item["line"]) if item.get("line") is not None else None
+            except (TypeError, ValueError):
+                line_number = None
+            
+            issues.append({
+                "type": analysis_type,
+                "filename": filename,
+                "line": line_number,
+                "severity": severity,
+                "description": description,
+                "suggestion": str(item.get("suggestion") or "Review and address the identified issue").strip(),
+                "impact": str(item.get("impact") or "").strip(),
+                "category": analysis_type
+            })
+        
+        return issues
+    
+    def _parse_text_issues(self, analysis_text: str, filename: str) -> List[Dict]:
+        """Enhanced parsing of free-form text with better error handling."""
+        issues = []
+        
+        try:
+            # Walk sections split by multiple possible delimiters
+            for section in _iter_sections(analysis_text):
+                issue_data = self._extract_issue_from_section(section, filename)
                 if issue_data:
                     issues.append(issue_data)
         
@@ -352,23 +685,19 @@ IMPORTANT:
             return None
             
         try:
-            lines = section.split("\n")
-            
-            # More flexible keyword matching
-            issue_keywords = ["ISSUE:", "BUG:", "PERF_ISSUE:", "STYLE_ISSUE:", "SECURITY:", "PROBLEM:", "VULNERABILITY:", "WARNING:"]
-            fix_keywords = ["FIX:", "SUGGESTION:", "OPTIMIZATION:", "RECOMMENDATION:", "SOLUTION:", "IMPROVE:"]
-            
             issue_line = ""
             fix_line = ""
             impact_line = ""
             
-            for line in lines:
-                line = line.strip()
-                if any(keyword in line.upper() for keyword in [k.rstrip(':') for k in issue_keywords]):
+            # One regex pass finds every keyword-prefixed line; later lines win
+            for match in _RE_SECTION_KEYWORD.finditer(section):
+                keyword = match.group("keyword").upper()
+                line = match.group("line").strip()
+                if keyword in _ISSUE_KEYS:
                     issue_line = line
-                elif any(keyword in line.upper() for keyword in [k.rstrip(':') for k in fix_keywords]):
+                elif keyword in _FIX_KEYS:
                     fix_line = line
-                elif "IMPACT:" in line.upper():
+                else:
                     impact_line = line
             
             if not issue_line and not fix_line:
@@ -388,40 +717,19 @@ IMPORTANT:
     def _extract_structured_data(self, issue_line: str, fix_line: str, impact_line: str, filename: str) -> Dict:
         """Enhanced structured data extraction."""
         # Clean up the lines
-        for prefix in ["ISSUE:", "BUG:", "PERF_ISSUE:", "STYLE_ISSUE:", "SECURITY:", "PROBLEM:", "VULNERABILITY:", "WARNING:"]:
-            issue_line = issue_line.replace(prefix, "").strip()
-            
-        for prefix in ["FIX:", "SUGGESTION:", "OPTIMIZATION:", "RECOMMENDATION:", "SOLUTION:", "IMPROVE:"]:
-            fix_line = fix_line.replace(prefix, "").strip()
-            
-        impact = impact_line.replace("IMPACT:", "").strip() if impact_line else ""
-        
-        # Enhanced severity extraction
-        severity = "medium"
-        severity_indicators = {
-            "critical": ["critical", "severe", "dangerous", "fatal", "security", "vulnerability"],
-            "high": ["high", "important", "significant", "major", "error"],
-            "medium": ["medium", "moderate", "warning", "issue"],
-            "low": ["low", "minor", "style", "formatting", "cosmetic"]
-        }
+        issue_line = _RE_ISSUE_PREFIX.sub("", issue_line).strip()
+        fix_line = _RE_FIX_PREFIX.sub("", fix_line).strip()
+        impact = _RE_IMPACT_PREFIX.sub("", impact_line).strip() if impact_line else ""
         
+        # Enhanced severity extraction: highest-priority severity mentioned wins
         text_to_check = (issue_line + " " + impact).lower()
-        for sev, indicators in severity_indicators.items():
-            if any(indicator in text_to_check for indicator in indicators):
-                severity = sev
-                break
+        found_severities = {match.lastgroup for match in _RE_SEVERITY.finditer(text_to_check)}
+        severity = next((sev for sev in SEVERITY_INDICATORS if sev in found_severities), "medium")
         
         # Enhanced line number extraction
         line_number = None
-        line_patterns = [
-            r'line\s*(\d+)',
-            r'@\s*(\d+)',
-            r':\s*(\d+)',
-            r'#\s*(\d+)'
-        ]
-        
-        for pattern in line_patterns:
-            match = re.search(pattern, issue_line, re.IGNORECASE)
+        for pattern in _RE_LINE_PATTERNS:
+            match = pattern.search(issue_line)
             if match:
                 line_number = int(match.group(1))
                 break
@@ -449,128 +757,238 @@ IMPORTANT:
 
 # Specific analyzer implementations with enhanced prompts
 class SecurityAnalyzer(BaseAnalyzer):
-    def get_analysis_type(self) -> str:
-        return "security"
+    CATEGORIES_TEXT = _format_categories([
+        "Injection vulnerabilities (SQL, NoSQL, Command, LDAP)",
+        "Cross-Site Scripting (XSS) and input validation",
+        "Authentication and authorization bypass",
+        "Cryptographic weaknesses and insecure storage",
+        "Information disclosure and data leaks",
+        "Insecure dependencies and vulnerable libraries",
+        "CSRF and session management flaws",
+        "Path traversal and directory attacks",
+        "Code injection and unsafe deserialization",
+        "Insecure API endpoints and missing access controls"
+    ])
     
-    def get_analysis_categories(self) -> List[str]:
-        return [
-            "Injection vulnerabilities (SQL, NoSQL, Command, LDAP)",
-            "Cross-Site Scripting (XSS) and input validation",
-            "Authentication and authorization bypass",
-            "Cryptographic weaknesses and insecure storage", 
-            "Information disclosure and data leaks",
-            "Insecure dependencies and vulnerable libraries",
-            "CSRF and session management flaws",
-            "Path traversal and directory attacks",
-            "Code injection and unsafe deserialization",
-            "Insecure API endpoints and missing access controls"
-        ]
+    OUTPUT_FORMAT = """Respond with a JSON object of the form:
+{"issues": [{"severity": "critical|high|medium|low", "line": <line number or null>, "description": "<security vulnerability>", "suggestion": "<specific security fix>", "impact": "<potential security impact>"}]}
+Return {"issues": []} if no issues are found."""
     
-    def get_output_format(self) -> str:
-        return """Format your response as:
-SECURITY: [severity] Line [number]: [description]
-FIX: [specific security fix]
-IMPACT: [potential security impact]
----"""
+    def get_analysis_type(self) -> str:
+        return "security"
 
 
 class PerformanceAnalyzer(BaseAnalyzer):
-    def get_analysis_type(self) -> str:
-        return "performance"
+    CATEGORIES_TEXT = _format_categories([
+        "Inefficient algorithms and data structure choices",
+        "N+1 query problems and database inefficiencies",
+        "Memory leaks and excessive memory allocation",
+        "Blocking operations in async/concurrent contexts",
+        "Inefficient loops and unnecessary iterations",
+        "Large object creation inside loops",
+        "Redundant network calls and I/O operations",
+        "Missing caching and poor cache strategies",
+        "Resource cleanup and connection management",
+        "CPU-intensive operations in main thread"
+    ])
     
-    def get_analysis_categories(self) -> List[str]:
-        return [
-            "Inefficient algorithms and data structure choices",
-            "N+1 query problems and database inefficiencies",
-            "Memory leaks and excessive memory allocation",
-            "Blocking operations in async/concurrent contexts",
-            "Inefficient loops and unnecessary iterations",
-            "Large object creation inside loops",
-            "Redundant network calls and I/O operations",
-            "Missing caching and poor cache strategies",
-            "Resource cleanup and connection management",
-            "CPU-intensive operations in main thread"
-        ]
+    OUTPUT_FORMAT = """Respond with a JSON object of the form:
+{"issues": [{"severity": "critical|high|medium|low", "line": <line number or null>, "description": "<performance problem>", "suggestion": "<specific performance fix>", "impact": "<expected performance improvement>"}]}
+Return {"issues": []} if no issues are found."""
     
-    def get_output_format(self) -> str:
-        return """Format your response as:
-PERF_ISSUE: [severity] Line [number]: [description]
-OPTIMIZATION: [specific performance fix]
-IMPACT: [expected performance improvement]
----"""
+    def get_analysis_type(self) -> str:
+        return "performance"
 
 
 class StyleAnalyzer(BaseAnalyzer):
-    def get_analysis_type(self) -> str:
-        return "style"
+    CATEGORIES_TEXT = _format_categories([
+        "Code formatting and consistent indentation",
+        "Naming conventions for variables, functions, classes",
+        "Code organization and logical structure",
+        "Documentation, comments, and inline explanations",
+        "Function/method length and complexity (cognitive load)",
+        "Code duplication and DRY principle violations",
+        "Error handling patterns and consistency",
+        "Import/dependency organization and cleanup",
+        "Code readability and maintainability",
+        "Language-specific style guide adherence"
+    ])
     
-    def get_analysis_categories(self) -> List[str]:
-        return [
-            "Code formatting and consistent indentation",
-            "Naming conventions for variables, functions, classes",
-            "Code organization and logical structure",
-            "Documentation, comments, and inline explanations",
-            "Function/method length and complexity (cognitive load)",
-            "Code duplication and DRY principle violations",
-            "Error handling patterns and consistency",
-            "Import/dependency organization and cleanup",
-            "Code readability and maintainability",
-            "Language-specific style guide adherence"
-        ]
+    OUTPUT_FORMAT = """Respond with a JSON object of the form:
+{"issues": [{"severity": "critical|high|medium|low", "line": <line number or null>, "description": "<style problem>", "suggestion": "<specific style improvement>"}]}
+Return {"issues": []} if no issues are found."""
     
-    def get_output_format(self) -> str:
-        return """Format your response as:
-STYLE_ISSUE: [severity] Line [number]: [description]
-SUGGESTION: [specific style improvement]
----"""
+    def get_analysis_type(self) -> str:
+        return "style"
 
 
 class LogicAnalyzer(BaseAnalyzer):
+    CATEGORIES_TEXT = _format_categories([
+        "Null/undefined reference errors and missing checks",
+        "Off-by-one errors in loops and array access",
+        "Incorrect conditional logic and boolean expressions",
+        "Race conditions and concurrency issues",
+        "Resource leaks and improper cleanup",
+        "Exception handling gaps and error propagation",
+        "Edge case handling and boundary conditions",
+        "Data type mismatches and conversion errors",
+        "Infinite loop potential and termination conditions",
+        "Control flow problems and unreachable code"
+    ])
+    
+    OUTPUT_FORMAT = """Respond with a JSON object of the form:
+{"issues": [{"severity": "critical|high|medium|low", "line": <line number or null>, "description": "<logic bug>", "suggestion": "<specific logic fix>", "impact": "<potential runtime impact>"}]}
+Return {"issues": []} if no issues are found."""
+    
     def get_analysis_type(self) -> str:
         return "logic"
+
+
+# Analyzers are stateless, so one instance (and one Groq client) per type is reused
+_ANALYZERS: Dict[type, BaseAnalyzer] = {}
+
+
+def _get_analyzer(analyzer_cls: type) -> BaseAnalyzer:
+    """Return the shared instance of an analyzer class."""
+    analyzer = _ANALYZERS.get(analyzer_cls)
+    if analyzer is None:
+        analyzer = _ANALYZERS[analyzer_cls] = analyzer_cls()
+    return analyzer
+
+
+def _load_json_object(analysis_text: str) -> Optional[Dict]:
+    """Decode an LLM response as a JSON object, or return None if it is not one."""
+    try:
+        data = json.loads(analysis_text)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class _JsonObjectScanner:
+    """Incrementally track brace depth to tell when a streamed JSON object closes."""
     
-    def get_analysis_categories(self) -> List[str]:
-        return [
-            "Null/undefined reference errors and missing checks",
-            "Off-by-one errors in loops and array access",
-            "Incorrect conditional logic and boolean expressions",
-            "Race conditions and concurrency issues",
-            "Resource leaks and improper cleanup",
-            "Exception handling gaps and error propagation",
-            "Edge case handling and boundary conditions",
-            "Data type mismatches and conversion errors", 
-            "Infinite loop potential and termination conditions",
-            "Control flow problems and unreachable code"
-        ]
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
     
-    def get_output_format(self) -> str:
-        return """Format your response as:
-BUG: [severity] Line [number]: [description]
-FIX: [specific logic fix]
-IMPACT: [potential runtime impact]
----"""
+    def feed(self, text: str) -> bool:
+        """Consume a chunk; return True once the top-level object is closed."""
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+def _iter_sections(analysis_text: str):
+    """Lazily yield stripped sections of an LLM response split on delimiters."""
+    start = 0
+    for delimiter in _RE_SECTION_SPLIT.finditer(analysis_text):
+        yield analysis_text[start:delimiter.start()].strip()
+        start = delimiter.end()
+    yield analysis_text[start:].strip()
+
+
+def _estimate_tokens(file_data: Dict) -> int:
+    """Rough input-token estimate for a file (~4 characters per token)."""
+    return len(file_data.get("patch") or file_data.get("content") or "") // 4
+
+
+def _chunk_files(files_changed: List[Dict]) -> List[List[Dict]]:
+    """Group files by language into batches bounded by BATCH_TOKEN_BUDGET."""
+    by_language = {}
+    for file_data in files_changed:
+        by_language.setdefault(file_data.get("language", "text"), []).append(file_data)
+    
+    batches = []
+    for language_files in by_language.values():
+        batch = []
+        batch_tokens = 0
+        for file_data in language_files:
+            tokens = _estimate_tokens(file_data)
+            if batch and (batch_tokens + tokens > BATCH_TOKEN_BUDGET or len(batch) >= MAX_FILES_PER_BATCH):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(file_data)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+    
+    return batches
+
+
+async def _analyze_files(analyzer: BaseAnalyzer, files_changed: List[Dict]) -> List[Dict]:
+    """Run analyzer over batched files concurrently, bounded by MAX_CONCURRENT_ANALYSES."""
+    # Only schedule LLM work for files the analyzer will actually review
+    candidates = [f for f in files_changed if analyzer.should_analyze_file(f)]
+    skipped_count = len(files_changed) - len(candidates)
+    if skipped_count:
+        logger.info(f"Skipping non-code files for {analyzer.get_analysis_type()} analysis",
+                   skipped_count=skipped_count)
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
+    batches = _chunk_files(candidates)
+    
+    async def _bounded_analyze(batch: List[Dict]) -> Dict[str, List[Dict]]:
+        async with semaphore:
+            return await analyzer.analyze_batch(batch)
+    
+    results = await asyncio.gather(
+        *(_bounded_analyze(batch) for batch in batches),
+        return_exceptions=True
+    )
+    
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            logger.error(f"{analyzer.get_analysis_type()} analysis failed",
+                        filenames=[f.get("filename") for f in batch], error=str(result))
+    
+    return list(chain.from_iterable(
+        file_issues
+        for result in results if not isinstance(result, Exception)
+        for file_issues in result.values()
+    ))
+
+
+def _summarize(issues: List[Dict]) -> Dict[str, int]:
+    """Count issues by severity in a single pass."""
+    severity_counts = Counter(i["severity"] for i in issues)
+    return {
+        "total_issues": len(issues),
+        "critical_issues": severity_counts["critical"],
+        "high_issues": severity_counts["high"],
+        "medium_issues": severity_counts["medium"],
+    }
 
 
 # Updated workflow functions with proper return statements for parallel execution
 async def security_review(state: Dict) -> Dict:
     """Perform security analysis on PR files."""
-    analyzer = SecurityAnalyzer()
+    analyzer = _get_analyzer(SecurityAnalyzer)
     files_changed = state.get("files_changed", [])
-    security_issues = []
     
     logger.info("Starting security analysis", files_count=len(files_changed))
     
-    for file_data in files_changed:
-        issues = await analyzer.analyze(file_data)
-        security_issues.extend(issues)
+    security_issues = await _analyze_files(analyzer, files_changed)
     
     security_results = {
         "issues": security_issues,
-        "summary": {
-            "total_issues": len(security_issues),
-            "critical_issues": len([i for i in security_issues if i["severity"] == "critical"]),
-            "high_issues": len([i for i in security_issues if i["severity"] == "high"]),
-        }
+        "summary": _summarize(security_issues),
     }
     
     logger.info("Security analysis completed", 
@@ -582,23 +1000,16 @@ async def security_review(state: Dict) -> Dict:
 
 async def performance_review(state: Dict) -> Dict:
     """Perform performance analysis on PR files."""
-    analyzer = PerformanceAnalyzer()
+    analyzer = _get_analyzer(PerformanceAnalyzer)
     files_changed = state.get("files_changed", [])
-    performance_issues = []
     
     logger.info("Starting performance analysis", files_count=len(files_changed))
     
-    for file_data in files_changed:
-        issues = await analyzer.analyze(file_data)
-        performance_issues.extend(issues)
+    performance_issues = await _analyze_files(analyzer, files_changed)
     
     performance_results = {
         "issues": performance_issues,
-        "summary": {
-            "total_issues": len(performance_issues),
-            "critical_issues": len([i for i in performance_issues if i["severity"] == "critical"]),
-            "high_issues": len([i for i in performance_issues if i["severity"] == "high"]),
-        }
+        "summary": _summarize(performance_issues),
     }
     
     logger.info("Performance analysis completed", 
@@ -610,23 +1021,16 @@ async def performance_review(state: Dict) -> Dict:
 
 async def style_review(state: Dict) -> Dict:
     """Perform style analysis on PR files."""
-    analyzer = StyleAnalyzer()
+    analyzer = _get_analyzer(StyleAnalyzer)
     files_changed = state.get("files_changed", [])
-    style_issues = []
     
     logger.info("Starting style analysis", files_count=len(files_changed))
     
-    for file_data in files_changed:
-        issues = await analyzer.analyze(file_data)
-        style_issues.extend(issues)
+    style_issues = await _analyze_files(analyzer, files_changed)
     
     style_results = {
         "issues": style_issues,
-        "summary": {
-            "total_issues": len(style_issues),
-            "high_issues": len([i for i in style_issues if i["severity"] == "high"]),
-            "medium_issues": len([i for i in style_issues if i["severity"] == "medium"]),
-        }
+        "summary": _summarize(style_issues),
     }
     
     logger.info("Style analysis completed", 
@@ -638,27 +1042,50 @@ async def style_review(state: Dict) -> Dict:
 
 async def logic_review(state: Dict) -> Dict:
     """Perform logic analysis on PR files."""
-    analyzer = LogicAnalyzer()
+    analyzer = _get_analyzer(LogicAnalyzer)
     files_changed = state.get("files_changed", [])
-    logic_issues = []
     
     logger.info("Starting logic analysis", files_count=len(files_changed))
     
-    for file_data in files_changed:
-        issues = await analyzer.analyze(file_data)
-        logic_issues.extend(issues)
+    logic_issues = await _analyze_files(analyzer, files_changed)
     
     logic_results = {
         "issues": logic_issues,
-        "summary": {
-            "total_issues": len(logic_issues),
-            "critical_issues": len([i for i in logic_issues if i["severity"] == "critical"]),
-            "high_issues": len([i for i in logic_issues if i["severity"] == "high"]),
-        }
+        "summary": _summarize(logic_issues),
     }
     
     logger.info("Logic analysis completed", 
                total_issues=len(logic_issues),
                critical_issues=logic_results["summary"]["critical_issues"])
     
-    return {"analysis_results": {"logic": logic_results}}
\ No newline at end of file
+    return {"analysis_results": {"logic": logic_results}}
+
+
+REVIEW_STAGES = {
+    "security": security_review,
+    "performance": performance_review,
+    "style": style_review,
+    "logic": logic_review,
+}
+
+
+async def run_all_reviews(state: Dict, analysis_types: Optional[List[str]] = None) -> Dict:
+    """Run the selected review stages concurrently and merge their results."""
+    selected = list(REVIEW_STAGES) if analysis_types is None else analysis_types
+    
+    logger.info("Starting concurrent review stages", analysis_types=selected)
+    
+    stage_results = await asyncio.gather(
+        *(REVIEW_STAGES[t](state) for t in selected),
+        return_exceptions=True
+    )
+    
+    # A failing stage must not discard the results of the others
+    analysis_results = {}
+    for analysis_type, result in zip(selected, stage_results):
+        if isinstance(result, Exception):
+            logger.error("Review stage failed", analysis_type=analysis_type, error=str(result))
+            continue
+        analysis_results.update(result["analysis_results"])
+    
+    return {"analysis_results": analysis_results}
@@ -1,8 +1,52 @@
-from typing import Dict, List
-from typing import Generator
+import os
+import asyncio
+from typing import Dict, List, Optional
+from app.services.cache_service import cache_service
 from app.services.github_service import github_service
 from app.utils.logging import logger
 
+# Cap concurrent content fetches to stay under GitHub's secondary rate limits
+MAX_CONCURRENT_FETCHES = 10
+
+# Files bigger than this (in changed lines) are reviewed from the patch only
+MAX_CHANGES_FOR_CONTENT = 2000
+# Data files rarely benefit from full content beyond this size
+MAX_DATA_FILE_CHANGES = 500
+_DATA_LANGUAGES = frozenset({"json", "xml", "yaml", "text"})
+# Generated or third-party files are never reviewed
+_VENDORED_DIRS = ("node_modules/", "vendor/", "dist/", "build/")
+_VENDORED_SUFFIXES = (".lock", "-lock.json", ".min.js", ".min.css", ".map")
+
+# File extension -> language, looked up once per file
+_EXT_MAP = {
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".jsx": "react",
+    ".tsx": "react-typescript",
+    ".java": "java",
+    ".go": "go",
+    ".rs": "rust",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".cs": "csharp",
+    ".php": "php",
+    ".rb": "ruby",
+    ".swift": "swift",
+    ".kt": "kotlin",
+    ".scala": "scala",
+    ".sql": "sql",
+    ".yml": "yaml",
+    ".yaml": "yaml",
+    ".json": "json",
+    ".xml": "xml",
+    ".html": "html",
+    ".css": "css",
+    ".scss": "scss",
+    ".md": "markdown",
+    ".sh": "bash",
+}
+
 async def fetch_pr_changes(state: Dict) -> Dict:
     """Fetch PR changes and prepare for analysis."""
     repo = state["repo"]
@@ -12,40 +56,25 @@ async def fetch_pr_changes(state: Dict) -> Dict:
     try:
         logger.info("Fetching PR changes", repo=repo, pr=pr_number)
         
-        # Get PR details
-        pr_details = await github_service.get_pr_details(repo, pr_number, token)
+        # Get PR details, reusing them if the caller already fetched them
+        pr_details = state.get("pr_details") or await github_service.get_pr_details(repo, pr_number, token)
         if not pr_details:
             raise Exception("Failed to fetch PR details")
         
-        # Get changed files
-        files_changed = await github_service.get_pr_files(repo, pr_number, token)
-        if not files_changed:
-            raise Exception("Failed to fetch PR files")
-        
-        # Fetch file contents for analysis
-        enhanced_files = []
-        for file in files_changed:
-            if file["status"] in ["added", "modified"]:
-                content = await github_service.get_file_content(
-                    repo, file["filename"], pr_details["head"]["sha"], token
-                )
-                
-                enhanced_file = {
-                    "filename": file["filename"],
-                    "status": file["status"],
-                    "additions": file.get("additions", 0),
-                    "deletions": file.get("deletions", 0),
-                    "changes": file.get("changes", 0),
-                    "patch": file.get("patch", ""),
-                    "content": content,
-                    "language": _detect_language(file["filename"])
-                }
-                enhanced_files.append(enhanced_file)
+        # Files at a given head SHA never change, so re-runs reuse the cached copy
+        head_sha = pr_details["head"]["sha"]
+        enhanced_files = await cache_service.get_pr_files(repo, pr_number, head_sha)
+        if enhanced_files is None:
+            enhanced_files = await _fetch_files(repo, pr_number, head_sha, token)
+            await cache_service.cache_pr_files(repo, pr_number, head_sha, enhanced_files)
+        else:
+            logger.info("Using cached PR files", repo=repo, pr=pr_number, sha=head_sha)
         
         state.update({
             "pr_details": pr_details,
             "files_changed": enhanced_files,
-            "commit_sha": pr_details["head"]["sha"],
+            "languages": frozenset(f["language"] for f in enhanced_files),
+            "commit_sha": head_sha,
             "pr_status": pr_details["state"],
             "review_context": {
                 "title": pr_details["title"],
@@ -67,39 +96,85 @@ async def fetch_pr_changes(state: Dict) -> Dict:
         state["error"] = str(e)
         return state
 
-def _detect_language(filename: str) -> str:
-    """Detect programming language from filename."""
-    extensions = {
-        ".py": "python",
-        ".js": "javascript", 
-        ".ts": "typescript",
-        ".jsx": "react",
-        ".tsx": "react-typescript",
-        ".java": "java",
-        ".go": "go",
-        ".rs": "rust",
-        ".cpp": "cpp",
-        ".c": "c",
-        ".cs": "csharp",
-        ".php": "php",
-        ".rb": "ruby",
-        ".swift": "swift",
-        ".kt": "kotlin",
-        ".scala": "scala",
-        ".sql": "sql",
-        ".yml": "yaml",
-        ".yaml": "yaml",
-        ".json": "json",
-        ".xml": "xml",
-        ".html": "html",
-        ".css": "css",
-        ".scss": "scss",
-        ".md": "markdown",
-        ".sh": "bash",
-    }
+async def _fetch_files(repo: str, pr_number: int, head_sha: str, token: str) -> List[Dict]:
+    """Fetch the PR's changed files with the content needed for analysis."""
+    # Get changed files
+    files_changed = await github_service.get_pr_files(repo, pr_number, token)
+    if not files_changed:
+        raise Exception("Failed to fetch PR files")
+    
+    # Skip content for vendored, binary and oversized files
+    analyzable = [f for f in files_changed if f["status"] in ["added", "modified"]]
+    skipped = {f["filename"]: reason for f in analyzable if (reason := _skip_content_reason(f))}
+    if skipped:
+        logger.info("Skipping content fetch", files=skipped)
+    to_fetch = [f for f in analyzable if f["filename"] not in skipped]
+    
+    # Fetch all file contents in one GraphQL round-trip
+    contents = await github_service.get_pr_file_contents_bulk(
+        repo, head_sha, [f["filename"] for f in to_fetch], token
+    )
+    
+    # Fall back to the REST contents API for anything GraphQL did not return
+    missing = [f for f in to_fetch if f["filename"] not in contents]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
     
-    for ext, lang in extensions.items():
-        if filename.lower().endswith(ext):
-            return lang
+    async def _fetch_content(file: Dict):
+        async with semaphore:
+            content = await github_service.get_file_content(
+                repo, file["filename"], head_sha, token, blob_sha=file.get("sha")
+            )
+        # get_file_content logs and swallows errors; surface them so the group aborts
+        if content is None:
+            raise Exception(f"Failed to fetch content for {file['filename']}")
+        return content
     
-    return "text"
\ No newline at end of file
+    # TaskGroup cancels the remaining fetches as soon as one fails
+    try:
+        async with asyncio.TaskGroup() as tg:
+            fetches = [tg.create_task(_fetch_content(file)) for file in missing]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    for file, fetch in zip(missing, fetches):
+        contents[file["filename"]] = fetch.result()
+    
+    enhanced_files = []
+    for file in analyzable:
+        skip_reason = skipped.get(file["filename"])
+        enhanced_file = {
+            "filename": file["filename"],
+            "status": file["status"],
+            "additions": file.get("additions", 0),
+            "deletions": file.get("deletions", 0),
+            "changes": file.get("changes", 0),
+            # Vendored and binary files are not reviewed at all
+            "patch": "" if skip_reason in ("vendored", "binary") else file.get("patch", ""),
+            "content": contents.get(file["filename"]),
+            "language": _detect_language(file["filename"])
+        }
+        if skip_reason:
+            enhanced_file["truncated"] = True
+        enhanced_files.append(enhanced_file)
+    
+    return enhanced_files
+
+def _skip_content_reason(file: Dict) -> Optional[str]:
+    """Return why a file's full content should not be fetched, or None to fetch it."""
+    filename = file["filename"].lower()
+    changes = file.get("changes", 0)
+    
+    if filename.startswith(_VENDORED_DIRS) or any(f"/{d}" in filename for d in _VENDORED_DIRS) \
+            or filename.endswith(_VENDORED_SUFFIXES):
+        return "vendored"
+    # GitHub omits the patch for binary files
+    if not file.get("patch") and changes == 0:
+        return "binary"
+    if changes > MAX_CHANGES_FOR_CONTENT:
+        return "too_large"
+    if changes > MAX_DATA_FILE_CHANGES and _detect_language(filename) in _DATA_LANGUAGES:
+        return "too_large"
+    return None
+
+def _detect_language(filename: str) -> str:
+    """Detect programming language from filename."""
+    return _EXT_MAP.get(os.path.splitext(filename)[1].lower(), "text")
@@ -1,15 +1,27 @@
-from typing import Dict, List
+from collections import defaultdict
+from typing import Dict, FrozenSet, List
 from typing_extensions import TypedDict, Annotated
-from langgraph.graph import StateGraph, END, add_messages
+from langgraph.graph import StateGraph, END
 from app.agents.code_fetcher import fetch_pr_changes
-from app.agents.analyzer import (
-    security_review,
-    performance_review,
-    style_review,
-    logic_review
-)
+from app.agents.analyzer import run_all_reviews
 from app.utils.logging import logger
 
+# Language sets used to route analyzers
+_NON_CODE_LANGUAGES = frozenset({"text", "markdown", "json", "yaml", "xml"})
+_SECURITY_LANGUAGES = frozenset({
+    "python", "javascript", "typescript", "java", "php", "go", 
+    "rust", "csharp", "cpp", "c", "ruby", "kotlin", "scala", "swift"
+})
+_PERFORMANCE_LANGUAGES = frozenset({
+    "python", "javascript", "typescript", "java", "go", "rust", 
+    "cpp", "c", "csharp", "kotlin", "scala", "swift"
+})
+
+# Analyzers emit canonical severity names; summaries tally them by index
+LOW, MEDIUM, HIGH, CRITICAL = range(4)
+_SEVERITY_INDEX = {"low": LOW, "medium": MEDIUM, "high": HIGH, "critical": CRITICAL}
+_NO_SEVERITIES = (0, 0, 0, 0)
+
 # Custom reducer for analysis results
 def merge_analysis_results(existing: Dict, new: Dict) -> Dict:
     """Merge analysis results from multiple analyzers."""
@@ -27,6 +39,7 @@ class ReviewState(TypedDict):
     # Fetched data
     pr_details: Dict
     files_changed: List[Dict]
+    languages: FrozenSet[str]
     commit_sha: str
     pr_status: str
     review_context: Dict
@@ -45,42 +58,34 @@ def create_summary(state: ReviewState) -> ReviewState:
         files_changed = state.get("files_changed", [])
         review_context = state.get("review_context", {})
         
-        # Aggregate all issues
+        # Aggregate all issues in one pass: group by file and count severities
         all_issues = []
-        total_critical = 0
-        total_high = 0
-        total_medium = 0
-        total_low = 0
+        files_with_issues = defaultdict(list)
+        severity_totals = [0, 0, 0, 0]
+        per_file_severity = defaultdict(lambda: [0, 0, 0, 0])
         
         for analysis_type, data in analysis_results.items():
             issues = data.get("issues", [])
             all_issues.extend(issues)
             
-            # Count by severity
             for issue in issues:
-                severity = issue.get("severity", "medium")
-                if severity == "critical":
-                    total_critical += 1
-                elif severity == "high":
-                    total_high += 1
-                elif severity == "medium":
-                    total_medium += 1
-                elif severity == "low":
-                    total_low += 1
+                filename = issue.get("filename", "unknown")
+                severity = _SEVERITY_INDEX[issue["severity"]]
+                files_with_issues[filename].append(issue)
+                severity_totals[severity] += 1
+                per_file_severity[filename][severity] += 1
         
-        # Group issues by file
-        files_with_issues = {}
-        for issue in all_issues:
-            filename = issue.get("filename", "unknown")
-            if filename not in files_with_issues:
-                files_with_issues[filename] = []
-            files_with_issues[filename].append(issue)
+        total_critical = severity_totals[CRITICAL]
+        total_high = severity_totals[HIGH]
+        total_medium = severity_totals[MEDIUM]
+        total_low = severity_totals[LOW]
         
         # Create file summaries
         file_summaries = []
         for file_data in files_changed:
             filename = file_data["filename"]
             file_issues = files_with_issues.get(filename, [])
+            file_severity = per_file_severity.get(filename, _NO_SEVERITIES)
             
             file_summary = {
                 "name": filename,
@@ -89,8 +94,8 @@ def create_summary(state: ReviewState) -> ReviewState:
                 "changes": file_data.get("changes", 0),
                 "issues": file_issues,
                 "issue_count": len(file_issues),
-                "critical_count": len([i for i in file_issues if i["severity"] == "critical"]),
-                "high_count": len([i for i in file_issues if i["severity"] == "high"])
+                "critical_count": file_severity[CRITICAL],
+                "high_count": file_severity[HIGH]
             }
             file_summaries.append(file_summary)
         
@@ -106,7 +111,7 @@ def create_summary(state: ReviewState) -> ReviewState:
             },
             "analysis_summary": {
                 "total_files": len(files_changed),
-                "files_with_issues": len([f for f in file_summaries if f["issue_count"] > 0]),
+                "files_with_issues": sum(1 for f in file_summaries if f["issue_count"] > 0),
                 "total_issues": len(all_issues),
                 "critical_issues": total_critical,
                 "high_issues": total_high,
@@ -146,7 +151,7 @@ def _generate_recommendations(analysis_results: Dict, critical_count: int, high_
     
     # Performance recommendations
     perf_issues = analysis_results.get("performance", {}).get("issues", [])
-    if len([i for i in perf_issues if i["severity"] in ["critical", "high"]]) > 0:
+    if any(i["severity"] in ("critical", "high") for i in perf_issues):
         recommendations.append("⚡ Performance: Profile the application to validate performance improvements.")
     
     # Style recommendations
@@ -160,76 +165,50 @@ def _generate_recommendations(analysis_results: Dict, critical_count: int, high_
     return recommendations
 
 def route_analyzers(state: ReviewState) -> List[str]:
-    """Intelligently route to relevant analyzers based on file content."""
-    files_changed = state.get("files_changed", [])
-    languages = {f.get("language", "text") for f in files_changed}
+    """Intelligently select relevant analyzers based on file content."""
+    languages = state.get("languages")
+    if languages is None:
+        languages = frozenset(f.get("language", "text") for f in state.get("files_changed", []))
     
-    # Start with always-run analyzers
     routes = []
     
     # Always run style and logic for any code files
-    code_languages = languages - {"text", "markdown", "json", "yaml", "xml"}
-    if code_languages:
-        routes.extend(["style_analysis", "logic_analysis"])
+    if languages - _NON_CODE_LANGUAGES:
+        routes.extend(["style", "logic"])
     
     # Run security for security-relevant languages
-    security_languages = {
-        "python", "javascript", "typescript", "java", "php", "go", 
-        "rust", "csharp", "cpp", "c", "ruby", "kotlin", "scala", "swift"
-    }
-    if languages & security_languages:
-        routes.append("security_analysis")
+    if languages & _SECURITY_LANGUAGES:
+        routes.append("security")
     
     # Run performance for performance-critical languages
-    perf_languages = {
-        "python", "javascript", "typescript", "java", "go", "rust", 
-        "cpp", "c", "csharp", "kotlin", "scala", "swift"
-    }
-    if languages & perf_languages:
-        routes.append("performance_analysis")
-    
-    # Always include summary
-    routes.append("create_summary")
+    if languages & _PERFORMANCE_LANGUAGES:
+        routes.append("performance")
     
     logger.info("Smart analyzer routing", 
                languages=list(languages), 
-               routes=[r for r in routes if r != "create_summary"])
+               routes=routes)
     
     return routes
 
+async def run_analyzers(state: ReviewState) -> Dict:
+    """Run all routed analyzers concurrently in a single workflow step."""
+    return await run_all_reviews(state, route_analyzers(state))
+
 def create_review_workflow():
-    """Create optimized workflow with proper parallel execution handling."""
+    """Create optimized workflow with concurrent analyzer execution."""
     workflow = StateGraph(ReviewState)
     
     # Add all nodes
     workflow.add_node("fetch_code", fetch_pr_changes)
-    workflow.add_node("security_analysis", security_review)
-    workflow.add_node("performance_analysis", performance_review)
-    workflow.add_node("style_analysis", style_review)
-    workflow.add_node("logic_analysis", logic_review)
+    workflow.add_node("code_analysis", run_analyzers)
     workflow.add_node("create_summary", create_summary)
     
     # Set entry point
     workflow.set_entry_point("fetch_code")
     
-    # Smart routing after fetch - runs relevant analyzers in parallel
-    workflow.add_conditional_edges(
-        "fetch_code",
-        route_analyzers,
-        {
-            "security_analysis": "security_analysis",
-            "performance_analysis": "performance_analysis", 
-            "style_analysis": "style_analysis",
-            "logic_analysis": "logic_analysis",
-            "create_summary": "create_summary"
-        }
-    )
-    
-    # All analyzers flow to summary (fan-in pattern)
-    workflow.add_edge("security_analysis", "create_summary")
-    workflow.add_edge("performance_analysis", "create_summary")
-    workflow.add_edge("style_analysis", "create_summary")
-    workflow.add_edge("logic_analysis", "create_summary")
+    # Relevant analyzers run concurrently inside a single node
+    workflow.add_edge("fetch_code", "code_analysis")
+    workflow.add_edge("code_analysis", "create_summary")
     
     # End workflow
     workflow.add_edge("create_summary", END)
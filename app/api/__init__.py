@@ -1,5 +1,12 @@
 """API routes for the Code Review Agent."""
 
-from . import auth, analysis, webhooks
+import importlib
 
-__all__ = ["auth", "analysis", "webhooks"]
\ No newline at end of file
+__all__ = ["auth", "analysis", "webhooks"]
+
+
+def __getattr__(name):
+    # Route modules pull in heavy dependencies, so load them on first access
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
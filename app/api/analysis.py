@@ -1,22 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, HttpUrl
-import httpx
 from typing import Optional
 import uuid
 from datetime import datetime
-import os
-from dotenv import load_dotenv
 
 from app.models import get_db, AnalysisTask, TaskStatus, User
 from app.api.auth import get_current_user
 from app.tasks.analysis_tasks import analyze_pr_task
 from app.services.github_service import github_service
+from app.services.cache_service import cache_service
 from app.utils.logging import logger
 from app.utils.monitoring import REQUEST_COUNT
 
-load_dotenv()
-
 router = APIRouter(prefix="/api/v1", tags=["analysis"])
 
 class AnalyzePRRequest(BaseModel):
@@ -43,7 +42,7 @@ class AnalysisResultResponse(BaseModel):
 async def analyze_pr(
     request: AnalyzePRRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Start PR analysis task."""
     try:
@@ -79,43 +78,17 @@ async def analyze_pr(
                 detail=f"No access to repository: {repo}"
             )
         
-        # Check if PR exists
-        async with httpx.AsyncClient() as client:
-            pr_response = await client.get(
-                f"https://api.github.com/repos/{repo}/pulls/{request.pr_number}",
-                headers={"Authorization": f"token {github_token}"}
+        # Check if PR exists; the details are cached for the worker
+        pr_details = await github_service.get_pr_details(repo, request.pr_number, github_token)
+        if not pr_details:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"PR #{request.pr_number} not found in {repo}"
             )
-            
-            if pr_response.status_code == 404:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"PR #{request.pr_number} not found in {repo}"
-                )
-            elif pr_response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Failed to fetch PR details: {pr_response.status_code}"
-                )
-            
-            pr_details = pr_response.json()
-        
-        # Check for existing running task for this PR
-        existing_task = db.query(AnalysisTask).filter(
-            AnalysisTask.user_id == current_user.id,
-            AnalysisTask.repo_url == str(request.repo_url),
-            AnalysisTask.pr_number == request.pr_number,
-            AnalysisTask.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING])
-        ).first()
+        await cache_service.cache_pr_details(repo, request.pr_number, pr_details)
         
-        if existing_task:
-            logger.info("Returning existing task", task_id=existing_task.task_id)
-            return {
-                "task_id": existing_task.task_id,
-                "status": "already_running",
-                "message": "Analysis already in progress for this PR"
-            }
-        
-        # Create new analysis task
+        # Insert the task directly; the partial unique index on live tasks turns a
+        # concurrent or repeated submission into an IntegrityError instead of a duplicate
         task_id = str(uuid.uuid4())
         
         task_record = AnalysisTask(
@@ -127,8 +100,28 @@ async def analyze_pr(
             status=TaskStatus.PENDING
         )
         
-        db.add(task_record)
-        db.commit()
+        try:
+            db.add(task_record)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            existing_task = (await db.execute(
+                select(AnalysisTask).where(
+                    AnalysisTask.user_id == current_user.id,
+                    AnalysisTask.repo_url == str(request.repo_url),
+                    AnalysisTask.pr_number == request.pr_number,
+                    AnalysisTask.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING])
+                )
+            )).scalar_one_or_none()
+            if existing_task is None:
+                raise
+            
+            logger.info("Returning existing task", task_id=existing_task.task_id)
+            return {
+                "task_id": existing_task.task_id,
+                "status": "already_running",
+                "message": "Analysis already in progress for this PR"
+            }
         
         # Queue the analysis task
         analyze_pr_task.delay(
@@ -144,13 +137,9 @@ async def analyze_pr(
                    pr=request.pr_number,
                    user=current_user.github_username)
 
-        try:
-            import redis
-            r = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://redis:6379/0'))
-            queue_length = r.llen('celery')
+        queue_length = await cache_service.get_queue_length()
+        if queue_length is not None:
             logger.info("Current queue length", length=queue_length)
-        except Exception as e:
-            logger.error("Failed to check queue", error=str(e))
         
         REQUEST_COUNT.labels(method="POST", endpoint="/analyze-pr", status="success").inc()
         
@@ -177,14 +166,16 @@ async def analyze_pr(
 async def get_task_status(
     task_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get analysis task status."""
     try:
-        task = db.query(AnalysisTask).filter(
-            AnalysisTask.task_id == task_id,
-            AnalysisTask.user_id == current_user.id
-        ).first()
+        task = (await db.execute(
+            select(AnalysisTask).where(
+                AnalysisTask.task_id == task_id,
+                AnalysisTask.user_id == current_user.id
+            )
+        )).scalar_one_or_none()
         
         if not task:
             raise HTTPException(
@@ -215,14 +206,16 @@ async def get_task_status(
 async def get_analysis_results(
     task_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get analysis results."""
     try:
-        task = db.query(AnalysisTask).filter(
-            AnalysisTask.task_id == task_id,
-            AnalysisTask.user_id == current_user.id
-        ).first()
+        task = (await db.execute(
+            select(AnalysisTask).where(
+                AnalysisTask.task_id == task_id,
+                AnalysisTask.user_id == current_user.id
+            )
+        )).scalar_one_or_none()
         
         if not task:
             raise HTTPException(
@@ -236,17 +229,19 @@ async def get_analysis_results(
                 detail=f"Task not completed. Status: {task.status.value}"
             )
         
-        return AnalysisResultResponse(
-            task_id=task.task_id,
-            status=task.status.value,
-            results=task.results,
-            metadata={
+        # Results are already plain JSON data; encode directly with orjson and
+        # skip the response-model validation pass over the large nested payload
+        return ORJSONResponse(content={
+            "task_id": task.task_id,
+            "status": task.status.value,
+            "results": task.results,
+            "metadata": {
                 "repo_url": task.repo_url,
                 "pr_number": task.pr_number,
                 "commit_sha": task.commit_sha,
                 "analysis_timestamp": task.completed_at.isoformat() if task.completed_at else None
             }
-        )
+        })
         
     except HTTPException:
         raise
@@ -260,20 +255,34 @@ async def get_analysis_results(
 @router.get("/history")
 async def get_analysis_history(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     limit: int = 10,
     offset: int = 0
 ):
     """Get user's analysis history."""
     try:
-        tasks = db.query(AnalysisTask).filter(
-            AnalysisTask.user_id == current_user.id
-        ).order_by(
-            AnalysisTask.created_at.desc()
-        ).offset(offset).limit(limit).all()
+        user_filter = AnalysisTask.user_id == current_user.id
         
+        # The window count gives the full total alongside the page in one query
+        rows = (await db.execute(
+            select(AnalysisTask, func.count().over().label("total")).where(
+                user_filter
+            ).order_by(
+                AnalysisTask.created_at.desc()
+            ).offset(offset).limit(limit)
+        )).all()
+        
+        if rows:
+            total = rows[0].total
+        elif offset > 0:
+            # An offset past the end returns no rows to carry the window count
+            total = await db.scalar(
+                select(func.count()).select_from(AnalysisTask).where(user_filter)
+            )
+        else:
+            total = 0
         history = []
-        for task in tasks:
+        for task, _ in rows:
             history.append({
                 "task_id": task.task_id,
                 "repo_url": task.repo_url,
@@ -286,7 +295,7 @@ async def get_analysis_history(
         
         return {
             "history": history,
-            "total": len(history),
+            "total": total,
             "limit": limit,
             "offset": offset
         }
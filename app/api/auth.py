@@ -1,17 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ValidationError
+from typing import Optional
+from app.config import settings
 from app.models import get_db, User
 from app.services.auth_service import auth_service
-from app.services.github_service import github_service
+from app.services.http import http_client
 from app.utils.logging import logger
-import httpx
-import os
-from dotenv import load_dotenv
-load_dotenv()
+import logging
+import asyncio
+from urllib.parse import urlencode
 
 
+# OAuth configuration is fixed for the process lifetime
+_CLIENT_ID = settings.github_client_id
+_CLIENT_SECRET = settings.github_client_secret
+_REDIRECT_URI = settings.github_oauth_redirect_uri or 'http://localhost:8000/auth/callback'
+_OAUTH_AUTHORIZE_URL = "https://github.com/login/oauth/authorize?"
+_OAUTH_BASE_PARAMS = (
+    ("client_id", _CLIENT_ID),
+    ("scope", "repo,read:user,user:email"),
+    ("redirect_uri", _REDIRECT_URI),
+)
+
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
 
@@ -19,6 +33,13 @@ class GitHubCallbackRequest(BaseModel):
     code: str
     state: str
 
+class GitHubUser(BaseModel):
+    """Fields of GitHub's /user response used at login."""
+    id: int
+    login: str
+    email: Optional[str] = None
+    avatar_url: Optional[str] = None
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -30,27 +51,13 @@ async def github_login():
     import secrets
     state = secrets.token_urlsafe(32)
     
-    # Get GitHub OAuth config from environment variables
-    github_client_id = os.getenv('GITHUB_CLIENT_ID')
-    github_redirect_uri = os.getenv('GITHUB_OAUTH_REDIRECT_URI') or 'http://localhost:8000/auth/callback'
-    
-    # Debug logging
-    logger.info(f"GitHub Client ID: {github_client_id}")
-    logger.info(f"GitHub Redirect URI: {github_redirect_uri}")
-    
-    if not github_client_id or not github_redirect_uri:
+    if not _CLIENT_ID:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Missing GitHub OAuth configuration. Client ID: {github_client_id}, Redirect URI: {github_redirect_uri}"
+            detail=f"Missing GitHub OAuth configuration. Client ID: {_CLIENT_ID}, Redirect URI: {_REDIRECT_URI}"
         )
     
-    oauth_url = (
-        f"https://github.com/login/oauth/authorize"
-        f"?client_id={github_client_id}"
-        f"&scope=repo,read:user"
-        f"&state={state}"
-        f"&redirect_uri={github_redirect_uri}"
-    )
+    oauth_url = _OAUTH_AUTHORIZE_URL + urlencode(_OAUTH_BASE_PARAMS + (("state", state),))
     
     return {
         "oauth_url": oauth_url,
@@ -61,7 +68,7 @@ async def github_login():
 async def github_callback_get(
     code: str,
     state: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Handle GitHub OAuth callback (GET redirect)."""
     request = GitHubCallbackRequest(code=code, state=state)
@@ -70,103 +77,88 @@ async def github_callback_get(
 @router.post("/callback", response_model=TokenResponse)
 async def github_callback_post(
     request: GitHubCallbackRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Handle GitHub OAuth callback."""
     try:
-        logger.info(f"Starting OAuth callback with code: {request.code[:10]}...")
-
-        github_client_id = os.getenv('GITHUB_CLIENT_ID')
-        github_client_secret = os.getenv('GITHUB_CLIENT_SECRET')
-
-        logger.info(f"Using GitHub Client ID: {github_client_id}")
-        logger.info(f"Using GitHub Client Secret: {github_client_secret[:8]}..." if github_client_secret else "No client secret")
-        
         # Exchange code for access token - do it directly instead of using github_service
-        async with httpx.AsyncClient() as client:
-            # Get GitHub token directly
-            token_data = {
-                "client_id": github_client_id,
-                "client_secret": github_client_secret,
-                "code": request.code,
-            }
-            
-            logger.info(f"Making request to GitHub with code: {request.code[:10]}...")
-            
-            token_response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                data=token_data,
-                headers={"Accept": "application/json"}
+        token_data = {
+            "client_id": _CLIENT_ID,
+            "client_secret": _CLIENT_SECRET,
+            "code": request.code,
+        }
+        
+        token_response = await http_client.post(
+            "https://github.com/login/oauth/access_token",
+            data=token_data,
+            headers={"Accept": "application/json"}
+        )
+        
+        if token_response.status_code != 200:
+            logger.error(f"GitHub API returned status {token_response.status_code}: {token_response.text}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"GitHub API error: {token_response.status_code} - {token_response.text}"
+            )
+        
+        token_response_data = token_response.json()
+        github_token = token_response_data.get("access_token")
+        
+        if not github_token:
+            logger.error("No access token in GitHub response", error=token_response_data.get("error"))
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"GitHub response missing access_token: {token_response_data}"
             )
-            
-            logger.info(f"GitHub response status: {token_response.status_code}")
-            logger.info(f"GitHub response text: {token_response.text}")
-            
-            if token_response.status_code != 200:
-                logger.error(f"GitHub API returned status {token_response.status_code}: {token_response.text}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"GitHub API error: {token_response.status_code} - {token_response.text}"
-                )
-            
-            token_response_data = token_response.json()
-            github_token = token_response_data.get("access_token")
-            
-            if not github_token:
-                logger.error(f"No access token in GitHub response: {token_response_data}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"GitHub response missing access_token: {token_response_data}"
-                )
-        
-        logger.info("Successfully got GitHub token")
-        
-        # Get user information from GitHub - directly
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
+        
+        # Get user information from GitHub - directly. Users with a private email
+        # need /user/emails, so it is fetched alongside rather than after /user
+        user_response, primary_email = await asyncio.gather(
+            http_client.get(
                 "https://api.github.com/user",
                 headers={"Authorization": f"token {github_token}"}
+            ),
+            _fetch_primary_email(github_token),
+        )
+        
+        if user_response.status_code != 200:
+            logger.error(f"Failed to get user info - status: {user_response.status_code}, text: {user_response.text}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to get user information from GitHub: {user_response.status_code}"
             )
-            
-            logger.info(f"GitHub user API response status: {user_response.status_code}")
-            
-            if user_response.status_code != 200:
-                logger.error(f"Failed to get user info - status: {user_response.status_code}, text: {user_response.text}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Failed to get user information from GitHub: {user_response.status_code}"
-                )
-            
-            github_user = user_response.json()
-        
-        logger.info(f"Got GitHub user: {github_user.get('login', 'unknown')}")
-        
-        # Check if user exists, create if not
-        user = db.query(User).filter(
-            User.github_id == github_user["id"]
-        ).first()
         
-        if not user:
-            logger.info("Creating new user")
-            user = User(
-                github_id=github_user["id"],
-                github_username=github_user["login"],
-                email=github_user.get("email"),
-                avatar_url=github_user.get("avatar_url"),
-                access_token=github_token,  # In production, encrypt this
+        try:
+            github_user = GitHubUser.model_validate_json(user_response.content)
+        except ValidationError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unexpected user information from GitHub"
             )
-            db.add(user)
-        else:
-            logger.info("Updating existing user")
-            # Update existing user
-            user.github_username = github_user["login"]
-            user.email = github_user.get("email")
-            user.avatar_url = github_user.get("avatar_url")
-            user.access_token = github_token  # In production, encrypt this
-        
-        db.commit()
-        db.refresh(user)
-        logger.info(f"User saved with ID: {user.id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Got GitHub user", login=github_user.login)
+        
+        email = github_user.email if github_user.email is not None else primary_email
+        
+        # Create the user or refresh their GitHub profile in a single statement
+        profile = {
+            "github_username": github_user.login,
+            "email": email,
+            "avatar_url": github_user.avatar_url,
+            "access_token": github_token,
+        }
+        upsert = (
+            insert(User)
+            .values(github_id=github_user.id, **profile)
+            .on_conflict_do_update(
+                index_elements=[User.github_id],
+                set_={**profile, "updated_at": func.now()},
+            )
+            .returning(User)
+        )
+        result = await db.execute(upsert, execution_options={"populate_existing": True})
+        user = result.scalar_one()
+        await db.commit()
         
         # Create JWT token
         access_token = auth_service.create_access_token(
@@ -198,14 +190,31 @@ async def github_callback_post(
             detail=f"Authentication failed: {str(e)}"
         )
 
+async def _fetch_primary_email(github_token: str) -> Optional[str]:
+    """Get the user's primary verified email when it is not public."""
+    try:
+        response = await http_client.get(
+            "https://api.github.com/user/emails",
+            headers={"Authorization": f"token {github_token}"}
+        )
+        if response.status_code != 200:
+            return None
+        return next(
+            (e["email"] for e in response.json() if e.get("primary") and e.get("verified")),
+            None
+        )
+    except Exception as e:
+        logger.warning("Failed to fetch GitHub user emails", error=str(e))
+        return None
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user."""
     try:
         token = credentials.credentials
-        user = auth_service.get_current_user(db, token)
+        user = await auth_service.get_current_user(db, token)
         
         if not user:
             raise HTTPException(
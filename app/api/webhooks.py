@@ -1,34 +1,45 @@
 from fastapi import APIRouter, Request, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import hashlib
 import hmac
-import json
-from app.models import get_db, User, AnalysisTask, TaskStatus
-from app.tasks.analysis_tasks import analyze_pr_task
-from app.services.github_service import github_service
+import orjson
+from app.models import get_db
+from app.services.cache_service import cache_service
 from app.config import settings
 from app.utils.logging import logger
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
-def verify_github_signature(payload: bytes, signature: str, secret: str) -> bool:
+# PR actions that can change the head commit, state or base of a cached PR
+_CACHE_INVALIDATING_ACTIONS = frozenset({"synchronize", "reopened", "closed", "edited"})
+
+# Events with a handler below; anything else is acknowledged without parsing the body
+_HANDLED_EVENTS = frozenset({"pull_request", "push", "installation"})
+
+# HMAC keyed once with the webhook secret; each request hashes on a copy of it
+_webhook_hmac = (
+    hmac.new(settings.github_webhook_secret.encode('utf-8'), digestmod=hashlib.sha256)
+    if settings.github_webhook_secret else None
+)
+
+def verify_github_signature(payload: bytes, signature: str) -> bool:
     """Verify GitHub webhook signature."""
-    if not signature.startswith('sha256='):
+    if _webhook_hmac is None or not signature.startswith('sha256='):
         return False
     
-    expected_signature = hmac.new(
-        secret.encode('utf-8'),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
+    try:
+        received_signature = bytes.fromhex(signature[7:])  # Remove 'sha256=' prefix
+    except ValueError:
+        return False
     
-    received_signature = signature[7:]  # Remove 'sha256=' prefix
-    return hmac.compare_digest(expected_signature, received_signature)
+    mac = _webhook_hmac.copy()
+    mac.update(payload)
+    return hmac.compare_digest(mac.digest(), received_signature)
 
 @router.post("/github")
 async def github_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Handle GitHub webhook events."""
     try:
@@ -38,20 +49,23 @@ async def github_webhook(
         
         # Verify signature if webhook secret is configured
         github_signature = headers.get('X-Hub-Signature-256', '')
-        webhook_secret = settings.github_webhook_secret
         
-        if webhook_secret and not verify_github_signature(payload, github_signature, webhook_secret):
+        if _webhook_hmac is not None and not verify_github_signature(payload, github_signature):
             logger.warning("Invalid GitHub webhook signature")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid signature"
             )
         
-        # Parse event data
         event_type = headers.get('X-GitHub-Event', '')
+        if event_type not in _HANDLED_EVENTS:
+            logger.info("Unhandled webhook event type", event_type=event_type)
+            return {"message": f"Event type {event_type} not handled"}
+        
+        # Parse event data
         try:
-            event_data = json.loads(payload.decode('utf-8'))
-        except json.JSONDecodeError:
+            event_data = orjson.loads(payload)
+        except orjson.JSONDecodeError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid JSON payload"
@@ -68,12 +82,8 @@ async def github_webhook(
             return await handle_push_event(event_data, db)
         
         # Handle installation events
-        elif event_type == "installation":
-            return await handle_installation_event(event_data, db)
-        
         else:
-            logger.info("Unhandled webhook event type", event_type=event_type)
-            return {"message": f"Event type {event_type} not handled"}
+            return await handle_installation_event(event_data, db)
             
     except HTTPException:
         raise
@@ -84,19 +94,23 @@ async def github_webhook(
             detail="Webhook processing failed"
         )
 
-async def handle_pull_request_event(event_data: dict, db: Session):
+async def handle_pull_request_event(event_data: dict, db: AsyncSession):
     """Handle pull request webhook events."""
     action = event_data.get('action')
     pull_request = event_data.get('pull_request', {})
     repository = event_data.get('repository', {})
     
+    repo_full_name = repository.get('full_name')
+    pr_number = pull_request.get('number')
+    
+    # Cached details, files and analyses of the PR are stale once it changes
+    if action in _CACHE_INVALIDATING_ACTIONS and repo_full_name and pr_number:
+        await cache_service.invalidate_pr(repo_full_name, pr_number)
+    
     # Only process opened, reopened, or synchronize events
     if action not in ['opened', 'reopened', 'synchronize']:
         return {"message": f"PR action {action} ignored"}
     
-    repo_full_name = repository.get('full_name')
-    pr_number = pull_request.get('number')
-    
     if not repo_full_name or not pr_number:
         logger.error("Missing repo or PR number in webhook")
         return {"error": "Invalid webhook data"}
@@ -117,7 +131,7 @@ async def handle_pull_request_event(event_data: dict, db: Session):
         "action": action
     }
 
-async def handle_push_event(event_data: dict, db: Session):
+async def handle_push_event(event_data: dict, db: AsyncSession):
     """Handle push webhook events."""
     repository = event_data.get('repository', {})
     ref = event_data.get('ref', '')
@@ -139,7 +153,7 @@ async def handle_push_event(event_data: dict, db: Session):
         "commits": len(commits)
     }
 
-async def handle_installation_event(event_data: dict, db: Session):
+async def handle_installation_event(event_data: dict, db: AsyncSession):
     """Handle GitHub App installation events."""
     action = event_data.get('action')
     installation = event_data.get('installation', {})
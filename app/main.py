@@ -1,16 +1,19 @@
-import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+import asyncio
+import os
 import time
 import uvicorn
 
 from app.config import settings
 from app.api import auth, analysis
 from app.utils.logging import logger, setup_logging
-from app.utils.monitoring import start_metrics_server, REQUEST_COUNT, REQUEST_DURATION
-from app.models import Base, engine
+from app.utils.monitoring import start_metrics_server, request_counter, REQUEST_DURATION
+from app.models import Base, async_engine
+from app.services.http import close_http_client
+from app.services.cache_service import cache_service
 
 # Setup logging
 setup_logging()
@@ -21,12 +24,13 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Code Review Agent API")
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
+    # Schema is managed by Alembic; CREATE_TABLES is for local/dev setups only
+    if os.getenv('CREATE_TABLES', 'false').lower() == 'true':
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        logger.info("Database tables created")
     
     # Only start metrics server on first worker to avoid port conflicts
-    import os
     import multiprocessing
     
     # Check if we're the first worker or running in single-process mode
@@ -49,16 +53,24 @@ async def lifespan(app: FastAPI):
     else:
         logger.info(f"Skipping metrics server on worker process {worker_id}")
     
+    # Keep this worker's L1 cache in step with invalidations from other processes
+    invalidation_listener = asyncio.create_task(cache_service.listen_for_invalidations())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Code Review Agent API")
+    invalidation_listener.cancel()
+    await close_http_client()
+    await async_engine.dispose()
+    await cache_service.close()
 
 # Create FastAPI application
 app = FastAPI(
     title="Code Review Agent API",
     description="AI-powered GitHub PR analysis system",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -71,31 +83,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Health probes and CORS preflights are neither logged nor counted
+HEALTH_PATH = "/health"
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    if request.method == "OPTIONS" or request.scope["path"] == HEALTH_PATH:
+        return await call_next(request)
     
-    # Process request
-    response = await call_next(request)
-    
-    # Log metrics
-    process_time = time.time() - start_time
-    REQUEST_DURATION.observe(process_time)
-    REQUEST_COUNT.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status=response.status_code
-    ).inc()
-    
-    # Log request details
-    logger.info("Request processed",
-                method=request.method,
-                path=request.url.path,
-                status_code=response.status_code,
-                process_time=process_time)
+    start_time = time.perf_counter()
+    status_code = 500
     
-    return response
+    try:
+        # Process request
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Log metrics, labelled by route template to keep cardinality bounded
+        process_time = time.perf_counter() - start_time
+        REQUEST_DURATION.observe(process_time)
+        route = request.scope.get("route")
+        request_counter(
+            request.method,
+            route.path if route else "unmatched",
+            status_code
+        ).inc()
+        
+        # Log request details
+        logger.info("Request processed",
+                    method=request.method,
+                    path=request.url.path,
+                    status_code=status_code,
+                    process_time=process_time)
 
 # Error handlers
 @app.exception_handler(Exception)
@@ -105,7 +126,7 @@ async def global_exception_handler(request: Request, exc: Exception):
                 method=request.method,
                 error=str(exc))
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -138,9 +159,15 @@ async def root():
     }
 
 if __name__ == "__main__":
+    reload = settings.log_level == "DEBUG"
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.log_level == "DEBUG"
+        loop="uvloop",
+        http="httptools",
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", "4")),
+        access_log=False,  # requests are already logged by the log_requests middleware
+        log_config=None,
+        reload=reload
     )
\ No newline at end of file
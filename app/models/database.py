@@ -1,23 +1,49 @@
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-engine = create_engine(
-    settings.database_url,
-    pool_size=10,
-    max_overflow=20,
+# Async drivers for the configured database URL
+_ASYNC_DRIVERS = {
+    "postgresql://": "postgresql+asyncpg://",
+    "postgres://": "postgresql+asyncpg://",
+}
+
+def _async_database_url(url: str) -> str:
+    for prefix, async_prefix in _ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+# Shared pool settings; LIFO reuse keeps a small set of connections warm.
+# With several API workers, put PgBouncer (port 6432) in front and size per worker.
+_POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_use_lifo=True,
+)
+
+# Sync engine for Celery workers, which run outside the API event loop
+engine = create_engine(
+    settings.database_url,
+    **_POOL_OPTIONS,
+)
+
+# Async engine for request handlers, so SQL round-trips never block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.database_url),
+    **_POOL_OPTIONS,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 Base = declarative_base()
 metadata = MetaData()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,11 +1,18 @@
+import hashlib
+from cachetools import LRUCache
 from sqlalchemy import TypeDecorator, Text
+from app.services.encryption_service import encryption_service, decrypt_cached
 from app.utils.logging import logger
 
+# Ciphertexts reused for recently written plaintexts, keyed by digest
+BIND_CACHE_SIZE = 10_000
+
 class EncryptedType(TypeDecorator):
     """Custom SQLAlchemy type that automatically encrypts/decrypts values."""
     
     impl = Text
     cache_ok = True
+    _bind_cache = LRUCache(maxsize=BIND_CACHE_SIZE)
     
     def process_bind_param(self, value, dialect):
         """Encrypt value before storing in database."""
@@ -14,13 +21,15 @@ class EncryptedType(TypeDecorator):
         
         if isinstance(value, str) and value:
             try:
-                from app.services.encryption_service import encryption_service
-                
                 if encryption_service.is_encrypted(value):
                     return value
                 
-                encrypted_value = encryption_service.encrypt(value)
-                logger.debug("Encrypted value for database storage")
+                key = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+                encrypted_value = self._bind_cache.get(key)
+                if encrypted_value is None:
+                    encrypted_value = encryption_service.encrypt(value)
+                    self._bind_cache[key] = encrypted_value
+                    logger.debug("Encrypted value for database storage")
                 return encrypted_value
             except Exception as e:
                 logger.error("Failed to encrypt value for database", error=str(e))
@@ -35,10 +44,8 @@ class EncryptedType(TypeDecorator):
         
         if isinstance(value, str) and value:
             try:
-                from app.services.encryption_service import encryption_service
-                
                 if encryption_service.is_encrypted(value):
-                    decrypted_value = encryption_service.decrypt(value)
+                    decrypted_value = decrypt_cached(value)
                     logger.debug("Decrypted value from database")
                     return decrypted_value
                 else:
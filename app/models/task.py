@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Enum
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Enum, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 import enum
 from app.models.database import Base
@@ -37,4 +37,18 @@ class AnalysisTask(Base):
     completed_at = Column(DateTime(timezone=True))
     
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        # At most one live task per user and PR; only pending/processing rows are
+        # indexed so it stays small as history grows. Enum columns store names.
+        Index(
+            "ix_task_user_repo_pr_pending",
+            "user_id", "repo_url", "pr_number",
+            unique=True,
+            postgresql_where=text("status IN ('PENDING', 'PROCESSING')"),
+            sqlite_where=text("status IN ('PENDING', 'PROCESSING')"),
+        ),
+        # Serves the newest-first history page for a user
+        Index("ix_task_user_created_at", "user_id", created_at.desc()),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict
 # from app.agents.workflow import review_workflow
 from app.services.cache_service import cache_service
 from app.services.github_service import github_service
@@ -25,8 +25,10 @@ class AnalysisService:
             if not repo:
                 raise ValueError(f"Invalid repository URL: {repo_url}")
             
-            # Check for cached results first
-            pr_details = await github_service.get_pr_details(repo, pr_number, github_token)
+            # Check for cached results first; PR details were usually cached on submission
+            pr_details = await cache_service.get_pr_details(repo, pr_number)
+            if not pr_details:
+                pr_details = await github_service.get_pr_details(repo, pr_number, github_token)
             if not pr_details:
                 raise ValueError(f"Cannot access PR {pr_number} in {repo}")
             
@@ -42,6 +44,7 @@ class AnalysisService:
                 "repo": repo,
                 "pr_number": pr_number,
                 "github_token": github_token,
+                "pr_details": pr_details,
                 "analysis_results": {},
                 "error": ""
             }
@@ -64,6 +67,7 @@ class AnalysisService:
                     "repo": repo,
                     "pr_number": pr_number,
                     "commit_sha": commit_sha,
+                    "languages": sorted(final_state.get("languages") or ()),
                     "analysis_timestamp": None
                 }
             }
@@ -1,22 +1,51 @@
 import os
+import time
+import base64
+import hashlib
+import hmac
+import orjson
 from datetime import datetime, timedelta, timezone
 from typing import Optional, TYPE_CHECKING
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
+from jose.exceptions import ExpiredSignatureError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.utils.logging import logger
 
 if TYPE_CHECKING:
     from app.models import User
 
-# Load environment variables
-load_dotenv()
+# Verified tokens map to a user snapshot for a short window, skipping JWT
+# verification and the user query on every authenticated request
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 100_000
+_USER_SNAPSHOT_FIELDS = ("id", "github_id", "github_username", "email", "avatar_url", "access_token", "is_active")
+
+def _b64url_encode(data: bytes) -> bytes:
+    """Encode a JWT segment as unpadded base64url."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# Header of every HS256 token we issue, encoded once
+_HS256_HEADER = _b64url_encode(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+
+def _b64url_decode(segment: str) -> bytes:
+    """Decode an unpadded base64url JWT segment."""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
 
 class AuthService:
     def __init__(self):
         self.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
         self.algorithm = os.getenv('ALGORITHM', 'HS256')
         self.expire_minutes = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', str(30 * 24 * 60)))  # 30 days default
+        self.user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        # Key encoded and HMAC keyed once; HS256 tokens are signed and verified on copies
+        self._key_bytes = self.secret_key.encode("utf-8")
+        self._jwt_hmac = hmac.new(self._key_bytes, digestmod=hashlib.sha256)
+    
+    @staticmethod
+    def _token_key(token: str) -> bytes:
+        """Digest used as cache key so raw tokens are not held in memory."""
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
     
     def create_access_token(self, user_id: int, github_id: int) -> str:
         """Create JWT access token for user."""
@@ -27,33 +56,87 @@ class AuthService:
             "exp": expire,
             "type": "access"
         }
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        if self.algorithm == "HS256":
+            to_encode["exp"] = int(expire.timestamp())
+            return self._sign_hs256(to_encode)
+        encoded_jwt = jwt.encode(to_encode, self._key_bytes, algorithm=self.algorithm)
         return encoded_jwt
     
+    def _sign_hs256(self, claims: dict) -> str:
+        """Sign claims as an HS256 JWT on a copy of the pre-keyed HMAC."""
+        signing_input = _HS256_HEADER + b"." + _b64url_encode(orjson.dumps(claims))
+        mac = self._jwt_hmac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + _b64url_encode(mac.digest())).decode("ascii")
+    
+    def _fast_verify_hs256(self, token: str) -> Optional[dict]:
+        """Verify an HS256 token splitting and decoding each segment once.
+        
+        Returns None for other algorithms so the caller can fall back to jose.
+        """
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = orjson.loads(_b64url_decode(header_b64))
+            if not isinstance(header, dict) or header.get("alg") != "HS256":
+                return None
+            
+            mac = self._jwt_hmac.copy()
+            mac.update(f"{header_b64}.{payload_b64}".encode("ascii"))
+            if not hmac.compare_digest(mac.digest(), _b64url_decode(signature_b64)):
+                raise JWTError("Signature verification failed.")
+            
+            payload = orjson.loads(_b64url_decode(payload_b64))
+        except ValueError:
+            raise JWTError("Invalid token.")
+        
+        if not isinstance(payload, dict):
+            raise JWTError("Invalid payload.")
+        now = time.time()
+        exp = payload.get("exp")
+        if exp is not None and (not isinstance(exp, (int, float)) or exp <= now):
+            raise ExpiredSignatureError("Signature has expired.")
+        nbf = payload.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+            raise JWTError("The token is not yet valid (nbf)")
+        return payload
+    
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify and decode JWT token."""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self._fast_verify_hs256(token) if self.algorithm == "HS256" else None
+            if payload is None:
+                payload = jwt.decode(token, self._key_bytes, algorithms=[self.algorithm])
             user_id: str = payload.get("sub")
             github_id: int = payload.get("github_id")
             
             if user_id is None or github_id is None:
                 return None
                 
-            return {"user_id": int(user_id), "github_id": github_id}
+            return {"user_id": int(user_id), "github_id": github_id, "exp": payload.get("exp")}
         except JWTError as e:
             logger.error("Token verification failed", error=str(e))
             return None
     
-    def get_current_user(self, db: Session, token: str) -> Optional["User"]:
+    async def get_current_user(self, db: AsyncSession, token: str) -> Optional["User"]:
         """Get current user from token."""
         from app.models import User
         
+        cache_key = self._token_key(token)
+        cached = self.user_cache.get(cache_key)
+        if cached is not None and (cached["exp"] is None or cached["exp"] > time.time()):
+            # Detached snapshot; request handlers only read column attributes
+            return User(**cached["user"])
+        
         payload = self.verify_token(token)
         if not payload:
             return None
         
-        user = db.query(User).filter(User.id == payload["user_id"]).first()
+        user = await db.get(User, payload["user_id"])
+        if user is not None:
+            self.user_cache[cache_key] = {
+                "exp": payload["exp"],
+                "user": {field: getattr(user, field) for field in _USER_SNAPSHOT_FIELDS},
+            }
         return user
 
 auth_service = AuthService()
\ No newline at end of file
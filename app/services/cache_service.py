@@ -1,30 +1,105 @@
-import json
+import orjson
 import asyncio
-from typing import Optional, Dict, Any
-from redis import Redis
+import zstandard
+from fnmatch import fnmatchcase
+from typing import Optional, Dict, Any, List, Tuple
+from redis.asyncio import Redis, ConnectionPool
 from cachetools import TTLCache
 from app.config import settings
 from app.utils.logging import logger
 
+# PR details validated by the API are reused by the worker for a short window
+PR_DETAILS_TTL = 120
+# Fetched files are keyed by head SHA and immutable; the TTL only bounds storage
+PR_FILES_TTL = 3600
+# Connections in the per-process Redis pool
+REDIS_MAX_CONNECTIONS = 64
+# Pub/Sub channel telling every process to drop a PR's entries from its L1 cache
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Values at least this large are stored zstd-compressed behind a one-byte
+# format marker; smaller (and legacy) values are plain JSON
+COMPRESS_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 3
+_ZSTD_MARKER = b"\x01"
+
+_MISSING = object()
+
 class CacheService:
     def __init__(self):
-        self.redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        pool = ConnectionPool.from_url(
+            settings.redis_url, max_connections=REDIS_MAX_CONNECTIONS
+        )
+        self.redis = Redis(connection_pool=pool)
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
         self.local_cache = TTLCache(maxsize=1000, ttl=300)  # 5min local cache
+        # Commands issued within one loop iteration, sent together as one pipeline
+        self._pending: List[Tuple[str, tuple, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def _enqueue(self, command: str, *args) -> asyncio.Future:
+        """Queue a Redis command for the next pipeline flush."""
+        loop = asyncio.get_running_loop()
+        if self._flush_task is not None and self._flush_task.get_loop() is not loop:
+            # Left over from another loop: the singleton is shared process-wide, and a forked
+            # worker or a one-off asyncio.run can inherit or abandon a half-built pipeline
+            self._pending, self._flush_task = [], None
+        future = loop.create_future()
+        self._pending.append((command, args, future))
+        if self._flush_task is None:
+            # The task first runs on the next loop iteration, after sibling coroutines enqueue
+            self._flush_task = loop.create_task(self._flush())
+        return future
+    
+    async def _flush(self):
+        """Send all queued commands in a single non-transactional pipeline."""
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for command, args, _ in batch:
+                getattr(pipe, command)(*args)
+            results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def _encode(self, value: Any) -> bytes:
+        payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        if len(payload) < COMPRESS_MIN_BYTES:
+            return payload
+        return _ZSTD_MARKER + self._compressor.compress(payload)
+    
+    def _decode(self, raw: bytes) -> Any:
+        # JSON never starts with the marker byte, so unmarked values are plain JSON
+        if raw[:1] == _ZSTD_MARKER:
+            return orjson.loads(self._decompressor.decompress(raw[1:]))
+        return orjson.loads(raw)
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache (L1: local, L2: Redis)."""
         try:
-            # L1: Local cache
-            if key in self.local_cache:
+            # L1: Local cache, one lookup instead of a membership test plus a get
+            local = self.local_cache.get(key, _MISSING)
+            if local is not _MISSING:
                 logger.debug("Cache hit (local)", key=key)
-                return self.local_cache[key]
+                return local
             
             # L2: Redis cache
-            cached = await asyncio.get_event_loop().run_in_executor(
-                None, self.redis.get, key
-            )
+            cached = await self._enqueue("get", key)
             if cached:
-                result = json.loads(cached)
+                result = self._decode(cached)
                 self.local_cache[key] = result
                 logger.debug("Cache hit (redis)", key=key)
                 return result
@@ -40,9 +115,7 @@ class CacheService:
         """Set value in cache with TTL."""
         try:
             # Set in Redis
-            await asyncio.get_event_loop().run_in_executor(
-                None, self.redis.setex, key, ttl, json.dumps(value)
-            )
+            await self._enqueue("setex", key, ttl, self._encode(value))
             
             # Set in local cache
             self.local_cache[key] = value
@@ -54,33 +127,114 @@ class CacheService:
     async def delete(self, key: str):
         """Delete key from cache."""
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None, self.redis.delete, key
-            )
+            await self._enqueue("delete", key)
             self.local_cache.pop(key, None)
             logger.debug("Cache delete", key=key)
             
         except Exception as e:
             logger.error("Cache delete error", key=key, error=str(e))
     
+    async def get_queue_length(self, queue: str = "celery") -> Optional[int]:
+        """Get the number of messages waiting in a Celery queue."""
+        try:
+            return await self.redis.llen(queue)
+        except Exception as e:
+            logger.error("Failed to check queue", queue=queue, error=str(e))
+            return None
+    
+    async def close(self):
+        """Release pooled Redis connections; the pool reconnects lazily if used again."""
+        await self.redis.connection_pool.disconnect()
+    
+    def _pr_key_patterns(self, repo: str, pr_number: int) -> List[str]:
+        """Glob patterns matching every cached entry of a PR."""
+        return [
+            self._pr_key("pr_details", repo, pr_number),
+            self._pr_key("analysis", repo, pr_number, "*"),
+            self._pr_key("pr_files", repo, pr_number, "*"),
+        ]
+    
+    def _drop_local(self, patterns: List[str]):
+        for key in [k for k in self.local_cache if any(fnmatchcase(k, p) for p in patterns)]:
+            self.local_cache.pop(key, None)
+    
+    async def invalidate_pr(self, repo: str, pr_number: int):
+        """Drop a PR's cached details, files and analyses from Redis and every L1 cache."""
+        patterns = self._pr_key_patterns(repo, pr_number)
+        try:
+            keys = [key for pattern in patterns async for key in self.redis.scan_iter(match=pattern, count=1000)]
+            if keys:
+                await self.redis.delete(*keys)
+            self._drop_local(patterns)
+            await self.redis.publish(INVALIDATION_CHANNEL, orjson.dumps({"repo": repo, "pr": pr_number}))
+            logger.info("Invalidated PR cache", repo=repo, pr=pr_number, keys=len(keys))
+        except Exception as e:
+            logger.error("Cache invalidation error", repo=repo, pr=pr_number, error=str(e))
+    
+    async def listen_for_invalidations(self):
+        """Apply invalidations published by other processes; runs until cancelled."""
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    event = orjson.loads(message["data"])
+                    self._drop_local(self._pr_key_patterns(event["repo"], event["pr"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Cache invalidation listener error", error=str(e))
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+    
     def get_cache_key(self, prefix: str, **kwargs) -> str:
         """Generate consistent cache key."""
         parts = [prefix] + [f"{k}:{v}" for k, v in sorted(kwargs.items())]
         return ":".join(parts)
     
+    @staticmethod
+    def _pr_key(prefix: str, repo: str, pr_number: int, sha: Optional[str] = None) -> str:
+        """PR-scoped key; same layout get_cache_key produces for repo/pr(/sha)."""
+        if sha is None:
+            return f"{prefix}:pr:{pr_number}:repo:{repo}"
+        return f"{prefix}:pr:{pr_number}:repo:{repo}:sha:{sha}"
+    
     async def get_pr_analysis(self, repo: str, pr_number: int, commit_sha: str) -> Optional[Dict]:
         """Get cached PR analysis result."""
-        key = self.get_cache_key("analysis", repo=repo, pr=pr_number, sha=commit_sha)
+        key = self._pr_key("analysis", repo, pr_number, commit_sha)
         return await self.get(key)
     
     async def cache_pr_analysis(self, repo: str, pr_number: int, commit_sha: str, 
                                result: Dict, pr_status: str = "open"):
         """Cache PR analysis result with smart TTL."""
-        key = self.get_cache_key("analysis", repo=repo, pr=pr_number, sha=commit_sha)
+        key = self._pr_key("analysis", repo, pr_number, commit_sha)
         
         # Smart TTL based on PR status
         ttl = 3600 if pr_status == "open" else 86400  # 1hr for open, 24hr for closed
         
         await self.set(key, result, ttl)
 
+    
+    async def get_pr_details(self, repo: str, pr_number: int) -> Optional[Dict]:
+        """Get PR details cached when the analysis was submitted."""
+        key = self._pr_key("pr_details", repo, pr_number)
+        return await self.get(key)
+    
+    async def cache_pr_details(self, repo: str, pr_number: int, pr_details: Dict):
+        """Cache PR details briefly so the worker does not re-fetch them."""
+        key = self._pr_key("pr_details", repo, pr_number)
+        await self.set(key, pr_details, PR_DETAILS_TTL)
+
+    
+    async def get_pr_files(self, repo: str, pr_number: int, commit_sha: str) -> Optional[List[Dict]]:
+        """Get the fetched files of a PR at a commit."""
+        key = self._pr_key("pr_files", repo, pr_number, commit_sha)
+        return await self.get(key)
+    
+    async def cache_pr_files(self, repo: str, pr_number: int, commit_sha: str, files: List[Dict]):
+        """Cache the fetched files of a PR at a commit so re-runs skip GitHub."""
+        key = self._pr_key("pr_files", repo, pr_number, commit_sha)
+        await self.set(key, files, PR_FILES_TTL)
+
 cache_service = CacheService()
\ No newline at end of file
@@ -1,13 +1,22 @@
 import os
 import base64
+import threading
+from cachetools import TTLCache, cached
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from typing import Optional
 from app.utils.logging import logger
-from dotenv import load_dotenv
 
-load_dotenv()
+# Decrypted values kept briefly for ciphertexts read repeatedly (e.g. a user's token),
+# matching the auth user cache so plaintext tokens do not outlive it in memory
+DECRYPT_CACHE_SIZE = 10_000
+DECRYPT_CACHE_TTL = 60
+# Fernet version byte, and how a token (version byte + zero-led timestamp) starts once encoded
+_FERNET_VERSION = b'\x80'
+_FERNET_PREFIX = b'gAAAAA'
+# PBKDF2 work factor. The key is derived at import, so the Celery master derives it
+# once and recycled children inherit it through fork instead of repeating the work
+PBKDF2_ITERATIONS = 100000
 
 class EncryptionService:
     def __init__(self):
@@ -31,28 +40,31 @@ class EncryptionService:
             password = encryption_key.encode('utf-8')
             salt = b'stable_salt_change_in_production'  # In production, use random salt per user
             
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,
-            )
-            
-            key = base64.urlsafe_b64encode(kdf.derive(password))
+            key = base64.urlsafe_b64encode(self._derive_key(password, salt))
             self._fernet = Fernet(key)
             
         except Exception as e:
             logger.error("Failed to initialize encryption", error=str(e))
             raise Exception("Encryption initialization failed")
     
+    def _derive_key(self, password: bytes, salt: bytes) -> bytes:
+        """Run PBKDF2 once per process; the key is held in memory only."""
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=PBKDF2_ITERATIONS,
+        )
+        return kdf.derive(password)
+    
     def encrypt(self, plaintext: str) -> str:
         """Encrypt a string value."""
         if not plaintext:
             return ""
         
         try:
-            encrypted_bytes = self._fernet.encrypt(plaintext.encode('utf-8'))
-            return base64.urlsafe_b64encode(encrypted_bytes).decode('utf-8')
+            # Fernet tokens are already urlsafe base64
+            return self._fernet.encrypt(plaintext.encode('utf-8')).decode('ascii')
         except Exception as e:
             logger.error("Encryption failed", error=str(e))
             raise Exception("Failed to encrypt data")
@@ -63,8 +75,11 @@ class EncryptionService:
             return ""
         
         try:
-            encrypted_bytes = base64.urlsafe_b64decode(ciphertext.encode('utf-8'))
-            decrypted_bytes = self._fernet.decrypt(encrypted_bytes)
+            token = ciphertext.encode('ascii')
+            if not token.startswith(_FERNET_PREFIX):
+                # Legacy values were base64-encoded a second time
+                token = base64.urlsafe_b64decode(token)
+            decrypted_bytes = self._fernet.decrypt(token)
             return decrypted_bytes.decode('utf-8')
         except Exception as e:
             logger.error("Decryption failed", error=str(e))
@@ -77,11 +92,16 @@ class EncryptionService:
             if not value or len(value) < 50:
                 return False
             
-            # Try to decode as base64
-            base64.urlsafe_b64decode(value.encode('utf-8'))
-            return True
+            # Fernet tokens start with version byte 0x80; legacy values decode to a token
+            decoded = base64.urlsafe_b64decode(value.encode('ascii'))
+            return decoded[:1] == _FERNET_VERSION or decoded.startswith(_FERNET_PREFIX)
         except Exception:
             return False
 
 # Global instance
-encryption_service = EncryptionService()
\ No newline at end of file
+encryption_service = EncryptionService()
+
+@cached(TTLCache(maxsize=DECRYPT_CACHE_SIZE, ttl=DECRYPT_CACHE_TTL), lock=threading.Lock())
+def decrypt_cached(ciphertext: str) -> str:
+    """Decrypt a value, memoizing by ciphertext."""
+    return encryption_service.decrypt(ciphertext)
@@ -1,13 +1,23 @@
 import os
-import httpx
+import re
+import json
+import asyncio
+import hashlib
+from functools import lru_cache
 from typing import Dict, List, Optional
 from urllib.parse import urlparse
 import circuitbreaker
-from dotenv import load_dotenv
+from app.services.cache_service import cache_service
+from app.services.http import http_client
 from app.utils.logging import logger
 
-# Load environment variables
-load_dotenv()
+# Aliased blob lookups per GraphQL query, keeps each query well under node limits
+GRAPHQL_BLOBS_PER_QUERY = 100
+
+# ETag cache lifetimes: PR metadata changes, content at a commit SHA never does
+GITHUB_METADATA_CACHE_TTL = 600
+GITHUB_CONTENT_CACHE_TTL = 7 * 24 * 3600
+_RE_COMMIT_SHA = re.compile(r'^[0-9a-f]{40}$')
 
 class GitHubService:
     def __init__(self):
@@ -16,10 +26,42 @@ class GitHubService:
         self.client_secret = os.getenv('GITHUB_CLIENT_SECRET')
         self.redirect_uri = os.getenv('GITHUB_OAUTH_REDIRECT_URI')
         
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
-        )
+        self.client = http_client
+    
+    async def _conditional_get(self, url: str, token: str, ttl: int,
+                               params: Optional[Dict] = None, immutable: bool = False,
+                               raw: bool = False):
+        """GET a JSON (or raw text) resource, revalidating a cached copy with its ETag.
+        
+        A 304 is served from the cache and does not count against the rate limit.
+        Immutable resources are served from the cache without revalidation.
+        """
+        # Responses depend on the caller's access, so the token is part of the key
+        fingerprint = hashlib.sha1(
+            f"{url}?{sorted((params or {}).items())}#{token}#{raw}".encode("utf-8")
+        ).hexdigest()
+        cache_key = cache_service.get_cache_key("github", url=fingerprint)
+        cached = await cache_service.get(cache_key)
+        if cached and immutable:
+            return cached["body"]
+        
+        headers = {"Authorization": f"token {token}"}
+        if raw:
+            headers["Accept"] = "application/vnd.github.raw"
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+        
+        response = await self.client.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            logger.debug("GitHub response not modified", url=url)
+            return cached["body"]
+        
+        response.raise_for_status()
+        body = response.content.decode("utf-8") if raw else response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            await cache_service.set(cache_key, {"etag": etag, "body": body}, ttl)
+        return body
     
     async def exchange_oauth_code(self, code: str) -> Optional[str]:
         """Exchange OAuth code for access token."""
@@ -69,22 +111,17 @@ class GitHubService:
         try:
             return await self._get_pr_details_impl(repo, pr_number, token)
         except Exception as e:
-            import traceback
-            tb_str = traceback.format_exc()
-            logger.error(f"get_pr_details FULL TRACEBACK: {tb_str}")
             logger.error("Failed to get PR details", repo=repo, pr=pr_number, error=str(e))
+            logger.debug("get_pr_details failed", exc_info=True)
             return None
     
     @circuitbreaker.circuit(failure_threshold=5, recovery_timeout=30, expected_exception=Exception)
     async def _get_pr_details_impl(self, repo: str, pr_number: int, token: str) -> Optional[Dict]:
         """Implementation of get PR details."""
         try:
-            response = await self.client.get(
-                f"{self.base_url}/repos/{repo}/pulls/{pr_number}",
-                headers={"Authorization": f"token {token}"}
+            return await self._conditional_get(
+                f"{self.base_url}/repos/{repo}/pulls/{pr_number}", token, GITHUB_METADATA_CACHE_TTL
             )
-            response.raise_for_status()
-            return response.json()
             
         except Exception as e:
             logger.error("Failed to get PR details", repo=repo, pr=pr_number, error=str(e))
@@ -102,49 +139,100 @@ class GitHubService:
     async def _get_pr_files_impl(self, repo: str, pr_number: int, token: str) -> List[Dict]:
         """Implementation of get PR files."""
         try:
-            response = await self.client.get(
-                f"{self.base_url}/repos/{repo}/pulls/{pr_number}/files",
-                headers={"Authorization": f"token {token}"}
+            return await self._conditional_get(
+                f"{self.base_url}/repos/{repo}/pulls/{pr_number}/files", token, GITHUB_METADATA_CACHE_TTL
             )
-            response.raise_for_status()
-            return response.json()
             
         except Exception as e:
             logger.error("Failed to get PR files", repo=repo, pr=pr_number, error=str(e))
             return []
     
-    async def get_file_content(self, repo: str, path: str, ref: str, token: str) -> Optional[str]:
+    async def get_file_content(self, repo: str, path: str, ref: str, token: str,
+                               blob_sha: Optional[str] = None) -> Optional[str]:
         """Get file content from GitHub."""
         try:
-            return await self._get_file_content_impl(repo, path, ref, token)
+            return await self._get_file_content_impl(repo, path, ref, token, blob_sha)
         except Exception as e:
             logger.error("Failed to get file content", repo=repo, path=path, error=str(e))
             return None
     
     @circuitbreaker.circuit(failure_threshold=5, recovery_timeout=30, expected_exception=Exception)
-    async def _get_file_content_impl(self, repo: str, path: str, ref: str, token: str) -> Optional[str]:
-        """Implementation of get file content."""
+    async def _get_file_content_impl(self, repo: str, path: str, ref: str, token: str,
+                                     blob_sha: Optional[str] = None) -> Optional[str]:
+        """Implementation of get file content.
+        
+        Content is requested in the raw media type, so no base64 JSON wrapper is
+        transferred or decoded. With the blob SHA from the PR files listing the
+        immutable blob is fetched directly.
+        """
         try:
-            response = await self.client.get(
-                f"{self.base_url}/repos/{repo}/contents/{path}",
-                params={"ref": ref},
-                headers={"Authorization": f"token {token}"}
+            if blob_sha:
+                return await self._conditional_get(
+                    f"{self.base_url}/repos/{repo}/git/blobs/{blob_sha}", token, GITHUB_CONTENT_CACHE_TTL,
+                    immutable=True, raw=True
+                )
+            return await self._conditional_get(
+                f"{self.base_url}/repos/{repo}/contents/{path}", token, GITHUB_CONTENT_CACHE_TTL,
+                params={"ref": ref}, immutable=bool(_RE_COMMIT_SHA.match(ref)), raw=True
             )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("encoding") == "base64":
-                import base64
-                return base64.b64decode(data["content"]).decode("utf-8")
-            
-            return data.get("content", "")
             
         except Exception as e:
             logger.error("Failed to get file content", repo=repo, path=path, error=str(e))
             return None
     
-    def parse_repo_url(self, repo_url: str) -> Optional[str]:
-        """Parse repository URL to get owner/repo format."""
+    async def get_pr_file_contents_bulk(self, repo: str, ref: str, paths: List[str], token: str) -> Dict[str, str]:
+        """Get contents of many files at one ref via aliased GraphQL blob lookups.
+        
+        Paths whose blob is binary, truncated or missing are left out of the result.
+        """
+        if not paths:
+            return {}
+        try:
+            chunks = [paths[i:i + GRAPHQL_BLOBS_PER_QUERY] for i in range(0, len(paths), GRAPHQL_BLOBS_PER_QUERY)]
+            results = await asyncio.gather(
+                *(self._get_file_contents_bulk_impl(repo, ref, chunk, token) for chunk in chunks)
+            )
+            contents = {}
+            for result in results:
+                contents.update(result)
+            return contents
+        except Exception as e:
+            logger.error("Failed to get bulk file contents", repo=repo, files_count=len(paths), error=str(e))
+            return {}
+    
+    @circuitbreaker.circuit(failure_threshold=5, recovery_timeout=30, expected_exception=Exception)
+    async def _get_file_contents_bulk_impl(self, repo: str, ref: str, paths: List[str], token: str) -> Dict[str, str]:
+        """Implementation of bulk file content lookup for one GraphQL query."""
+        owner, name = repo.split("/", 1)
+        aliases = "\n".join(
+            f"file{i}: object(expression: {json.dumps(f'{ref}:{path}')}) {{ ... on Blob {{ text isBinary isTruncated }} }}"
+            for i, path in enumerate(paths)
+        )
+        query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+        
+        response = await self.client.post(
+            f"{self.base_url}/graphql",
+            json={"query": query, "variables": {"owner": owner, "name": name}},
+            headers={"Authorization": f"bearer {token}"}
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        if data.get("errors"):
+            logger.warning("GraphQL errors fetching file contents", repo=repo, errors=data["errors"])
+        repository = (data.get("data") or {}).get("repository") or {}
+        
+        contents = {}
+        for i, path in enumerate(paths):
+            blob = repository.get(f"file{i}")
+            if blob and blob.get("text") is not None and not blob.get("isBinary") and not blob.get("isTruncated"):
+                contents[path] = blob["text"]
+        return contents
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse_repo_url(repo_url: str) -> Optional[str]:
+        """Parse repository URL to get owner/repo format (memoized; a deployment sees few repos)."""
         try:
             parsed = urlparse(repo_url)
             path = parsed.path.strip("/")
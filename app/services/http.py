@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Dict, Optional
+import httpx
+from app.utils.logging import logger
+
+# Cap on in-flight GitHub requests per process, and on how long a request
+# will wait out a rate-limit pause before being sent anyway
+GITHUB_MAX_CONCURRENCY = 64
+RATE_LIMIT_MAX_WAIT = 60.0
+
+
+class GitHubRateLimitTransport(httpx.AsyncBaseTransport):
+    """Transport that bounds concurrency and pauses a token once GitHub rate-limits it."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_concurrency: int):
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Monotonic deadline per Authorization header (None for anonymous calls)
+        self._paused_until: Dict[Optional[str], float] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request.headers.get("Authorization")
+        deadline = self._paused_until.get(key)
+        if deadline is not None:
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(min(delay, RATE_LIMIT_MAX_WAIT))
+            else:
+                self._paused_until.pop(key, None)
+
+        async with self._semaphore:
+            response = await self._transport.handle_async_request(request)
+        self._record_limits(key, response)
+        return response
+
+    def _record_limits(self, key: Optional[str], response: httpx.Response):
+        """Pause the token on secondary limits (Retry-After) or an exhausted primary quota."""
+        headers = response.headers
+        retry_after = headers.get("Retry-After")
+        if retry_after and response.status_code in (403, 429):
+            try:
+                self._pause(key, float(retry_after))
+            except ValueError:
+                self._pause(key, RATE_LIMIT_MAX_WAIT)
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            reset = headers.get("X-RateLimit-Reset")
+            if reset and reset.isdigit():
+                self._pause(key, int(reset) - time.time())
+
+    def _pause(self, key: Optional[str], seconds: float):
+        if seconds > 0:
+            self._paused_until[key] = time.monotonic() + seconds
+            logger.warning("GitHub rate limit reached, pausing requests", retry_in=round(seconds, 1))
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+# One pooled HTTP/2 client shared by all outbound GitHub calls, so TLS
+# handshakes are paid once and concurrent requests multiplex on a connection
+http_client = httpx.AsyncClient(
+    transport=GitHubRateLimitTransport(
+        httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,  # connect failures only; requests are never replayed
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=60)
+        ),
+        max_concurrency=GITHUB_MAX_CONCURRENCY
+    ),
+    timeout=httpx.Timeout(30.0, pool=10.0)
+)
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its connection pool."""
+    await http_client.aclose()
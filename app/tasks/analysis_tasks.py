@@ -1,19 +1,17 @@
 import os
+import threading
 from datetime import datetime, timezone
+from typing import Optional
 from celery import Celery
+from celery.signals import worker_process_init
 from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-from app.models import get_db, AnalysisTask, TaskStatus, User
+from app.models import AnalysisTask, TaskStatus, User
 from app.models.database import SessionLocal
 from app.utils.logging import logger
 from app.utils.monitoring import ANALYSIS_COUNT, ERROR_COUNT
-from typing import Dict
 
 import asyncio
-# Remove nest_asyncio completely - it causes issues in Celery
-
-# Load environment variables
-load_dotenv()
+import uvloop
 
 # Celery configuration using environment variables
 celery_app = Celery(
@@ -34,19 +32,64 @@ celery_app.conf.update(
     worker_max_tasks_per_child=1000,
 )
 
+# Rows removed per DELETE statement/transaction in cleanup_old_tasks
+CLEANUP_BATCH_SIZE = 1000
+
+# One uvloop event loop per worker process, running on a daemon thread. Tasks submit
+# coroutines to it, so the shared httpx, Redis and Groq connection pools stay
+# warm across tasks instead of being rebuilt by a fresh asyncio.run each time.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _reset_loop_after_fork():
+    # The loop thread does not survive fork; children start their own
+    global _loop, _loop_lock
+    _loop = None
+    _loop_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_loop_after_fork)
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            from app.services.cache_service import cache_service
+            
+            _loop = uvloop.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-tasks", daemon=True).start()
+            # The worker's L1 cache follows invalidations like the API's does
+            asyncio.run_coroutine_threadsafe(cache_service.listen_for_invalidations(), _loop)
+        return _loop
+
+def run_coroutine(coro):
+    """Run a coroutine on the worker's event loop and wait for its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result()
+    except BaseException:
+        # Soft time limits and other interrupts abandon the task; stop its work on the shared loop too
+        future.cancel()
+        raise
+
+@worker_process_init.connect
+def _preload_worker(**kwargs):
+    """Pay workflow imports and event loop startup at boot, not on a child's first task."""
+    from app.services.analysis_service import analysis_service
+    
+    analysis_service._get_workflow()
+    _get_loop()
+
 def run_async_analysis(repo_url: str, pr_number: int, github_token: str):
     """Synchronous wrapper for async analysis."""
     try:
         # Import here to avoid circular imports at module level
         from app.services.analysis_service import analysis_service
         
-        # Use asyncio.run() instead of manual loop management
-        result = asyncio.run(analysis_service.analyze_pr(
+        return run_coroutine(analysis_service.analyze_pr(
             repo_url=repo_url,
             pr_number=pr_number,
             github_token=github_token
         ))
-        return result
     except Exception as e:
         logger.error("Async analysis failed", error=str(e))
         raise
@@ -73,17 +116,18 @@ def analyze_pr_task(task_id: str, repo_url: str, pr_number: int, user_id: int):
         try:
             logger.info("Task started", task_id=task_id, repo_url=repo_url, pr_number=pr_number, user_id=user_id)
             
-            # Get task record
-            task_record = db.query(AnalysisTask).filter(
+            # Get task record and user (for the GitHub token) in one round-trip
+            row = db.query(AnalysisTask, User).outerjoin(
+                User, User.id == AnalysisTask.user_id
+            ).filter(
                 AnalysisTask.task_id == task_id
             ).first()
             
-            if not task_record:
+            if not row:
                 logger.error("Task record not found", task_id=task_id)
                 return {"error": "Task record not found"}
             
-            # Get user and GitHub token
-            user = db.query(User).filter(User.id == user_id).first()
+            task_record, user = row
             if not user:
                 logger.error("User not found", user_id=user_id)
                 task_record.status = TaskStatus.FAILED
@@ -133,16 +177,12 @@ def analyze_pr_task(task_id: str, repo_url: str, pr_number: int, user_id: int):
             return result
                 
         except Exception as e:
-            # Enhanced error logging
-            import traceback
-            import sys
-            
-            tb_str = traceback.format_exc()
-            print(f"\n{'='*60}\nFULL TRACEBACK:\n{tb_str}\n{'='*60}\n", file=sys.stderr)
+            # Most failures are GitHub/LLM errors already logged where they happened;
+            # the traceback is only formatted when debug logging is on
             logger.error("Task execution failed", 
                         task_id=task_id, 
-                        error=str(e),
-                        traceback=tb_str)
+                        error=str(e))
+            logger.debug("Task execution traceback", task_id=task_id, exc_info=True)
             
             # Update task with error
             if task_record:
@@ -158,18 +198,28 @@ def analyze_pr_task(task_id: str, repo_url: str, pr_number: int, user_id: int):
 @celery_app.task
 def cleanup_old_tasks():
     """Clean up old completed tasks."""
-    db: Session = next(get_db())
+    db: Session = SessionLocal()
     
     try:
         # Delete tasks older than 30 days
         from datetime import timedelta
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
         
-        deleted_count = db.query(AnalysisTask).filter(
-            AnalysisTask.completed_at < cutoff_date
-        ).delete()
+        # Delete in batches, committing each, so no single transaction holds
+        # row locks (and WAL) for the whole backlog
+        deleted_count = 0
+        while True:
+            batch = db.query(AnalysisTask.id).filter(
+                AnalysisTask.completed_at < cutoff_date
+            ).limit(CLEANUP_BATCH_SIZE).scalar_subquery()
+            deleted = db.query(AnalysisTask).filter(
+                AnalysisTask.id.in_(batch)
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted_count += deleted
+            if deleted < CLEANUP_BATCH_SIZE:
+                break
         
-        db.commit()
         logger.info("Cleaned up old tasks", count=deleted_count)
         
     except Exception as e:
@@ -203,7 +253,7 @@ def test_github_token(user_id: int):
             
             # Test the token with a simple GitHub API call
             from app.services.github_service import github_service
-            result = asyncio.run(github_service.get_user_info(user.access_token))
+            result = run_coroutine(github_service.get_user_info(user.access_token))
             
             if result:
                 return {
@@ -0,0 +1,89 @@
+import os
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from typing import Optional
+from app.config import settings
+from app.utils.logging import logger
+
+# Expired rows are swept from the database once every this many writes
+PRUNE_EVERY_WRITES = 100
+
+class LLMCache:
+    """Persistent SQLite cache of LLM responses keyed by a hash of the request."""
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily so importing this module never touches disk."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, ts INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_responses_ts ON llm_responses (ts)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_content: str, max_tokens: int) -> str:
+        """Build a cache key from everything that determines the LLM response."""
+        digest = hashlib.sha256()
+        for part in (model, str(max_tokens), system_prompt, user_content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, ts FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] < self.ttl:
+                return row[0]
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            conn.commit()
+        return None
+
+    def _set_sync(self, key: str, response: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, ts) VALUES (?, ?, ?)",
+                (key, response, int(time.time()))
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                conn.execute("DELETE FROM llm_responses WHERE ts < ?", (int(time.time()) - self.ttl,))
+            conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on miss/expiry."""
+        try:
+            return await asyncio.get_event_loop().run_in_executor(None, self._get_sync, key)
+        except Exception as e:
+            logger.error("LLM cache get error", error=str(e))
+            return None
+
+    async def set(self, key: str, response: str):
+        """Store a response in the cache."""
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._set_sync, key, response)
+        except Exception as e:
+            logger.error("LLM cache set error", error=str(e))
+
+llm_cache = LLMCache(settings.llm_cache_path, settings.llm_cache_ttl)
@@ -15,25 +15,30 @@ QUEUE_SIZE = Gauge('celery_queue_size', 'Celery queue size', ['queue'])
 ACTIVE_WORKERS = Gauge('celery_active_workers', 'Active Celery workers')
 ERROR_COUNT = Counter('errors_total', 'Total errors', ['error_type'])
 
+@functools.lru_cache(maxsize=1024)
+def request_counter(method: str, endpoint: str, status: int) -> Counter:
+    """Return the REQUEST_COUNT child for a label set, bound once per combination."""
+    return REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status)
+
 def track_time(metric: Histogram):
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
+            start_time = time.perf_counter()
             try:
                 result = await func(*args, **kwargs)
                 return result
             finally:
-                metric.observe(time.time() - start_time)
+                metric.observe(time.perf_counter() - start_time)
         
         @functools.wraps(func)
         def sync_wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
+            start_time = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
                 return result
             finally:
-                metric.observe(time.time() - start_time)
+                metric.observe(time.perf_counter() - start_time)
         
         return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
     return decorator
@@ -0,0 +1,76 @@
+"""Initial schema: users and analysis_tasks
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+
+Databases bootstrapped with Base.metadata.create_all already have these
+tables; they are left as they are so the revision can be applied to them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+task_status = sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED', name='taskstatus')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('github_id', sa.Integer(), nullable=False),
+            sa.Column('github_username', sa.String(), nullable=False),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('avatar_url', sa.String(), nullable=True),
+            sa.Column('access_token', sa.Text(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_github_id', 'users', ['github_id'], unique=True)
+        op.create_index('ix_users_github_username', 'users', ['github_username'], unique=True)
+        op.create_index('ix_users_email', 'users', ['email'])
+
+    if not inspector.has_table('analysis_tasks'):
+        op.create_table(
+            'analysis_tasks',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('task_id', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('repo_url', sa.String(), nullable=False),
+            sa.Column('pr_number', sa.Integer(), nullable=False),
+            sa.Column('commit_sha', sa.String(), nullable=True),
+            sa.Column('status', task_status, nullable=True),
+            sa.Column('progress', sa.Integer(), nullable=True),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.Column('results', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_analysis_tasks_id', 'analysis_tasks', ['id'])
+        op.create_index('ix_analysis_tasks_task_id', 'analysis_tasks', ['task_id'], unique=True)
+        op.create_index('ix_analysis_tasks_status', 'analysis_tasks', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analysis_tasks')
+    op.drop_table('users')
+    task_status.drop(op.get_bind(), checkfirst=True)
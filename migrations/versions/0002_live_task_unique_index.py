@@ -0,0 +1,52 @@
+"""At most one live analysis task per user and PR
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+
+analyze_pr relies on this partial unique index to deduplicate submissions.
+Live duplicates left by the old check-then-insert race are marked failed
+first, keeping the newest, so the index can be built.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Enum columns store member names
+LIVE_STATUSES = "status IN ('PENDING', 'PROCESSING')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    indexes = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('analysis_tasks')}
+    if 'ix_task_user_repo_pr_pending' in indexes:
+        return
+
+    op.execute(
+        "UPDATE analysis_tasks "
+        "SET status = 'FAILED', error_message = 'Superseded by a newer task for the same PR' "
+        f"WHERE {LIVE_STATUSES} AND id NOT IN ("
+        "SELECT MAX(id) FROM analysis_tasks "
+        f"WHERE {LIVE_STATUSES} GROUP BY user_id, repo_url, pr_number)"
+    )
+    op.create_index(
+        'ix_task_user_repo_pr_pending',
+        'analysis_tasks',
+        ['user_id', 'repo_url', 'pr_number'],
+        unique=True,
+        postgresql_where=sa.text(LIVE_STATUSES),
+        sqlite_where=sa.text(LIVE_STATUSES),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_user_repo_pr_pending', table_name='analysis_tasks')
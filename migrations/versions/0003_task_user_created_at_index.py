@@ -0,0 +1,37 @@
+"""Index analysis history by user and recency
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+
+Serves the history endpoint's per-user, newest-first page query.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    indexes = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('analysis_tasks')}
+    if 'ix_task_user_created_at' in indexes:
+        return
+
+    op.create_index(
+        'ix_task_user_created_at',
+        'analysis_tasks',
+        ['user_id', sa.text('created_at DESC')],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_user_created_at', table_name='analysis_tasks')